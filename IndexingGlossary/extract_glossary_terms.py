@@ -1,23 +1,313 @@
 #!/usr/bin/env python3
 """
 Glossary Term Extraction Script for LaTeX Project
-Extracts terms from \index{} entries and content analysis
+Extracts terms from \index{} entries and content analysis, and proposes
+new terms (glossary_candidates.json) from phrases repeated across chapters
 """
 
 import re
+import sys
 import json
+import hashlib
 import os
+import mmap
+import argparse
+from array import array
 from pathlib import Path
-from collections import defaultdict
-from typing import Dict, List, Set, Tuple
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+# Worker pool and result cache shared with the indexing scripts
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+from file_pool import map_files
+from term_cache import DEFAULT_CACHE_DIR, read_entry, write_entry
+
+# Bump when extract_file() output changes, so cached results are not reused
+EXTRACTION_VERSION = "2"
+
+# Longest candidate phrase, in words
+MAX_NGRAM = 4
+
+# Argument in braces, allowing two levels of nested braces
+BRACED = r'\{(?:[^{}]|\{(?:[^{}]|\{[^{}]*\})*\})*\}'
+
+# Markup that is not prose: comments, math, environment options (table
+# specs), commands whose arguments are keys or paths, and any other command
+# name (its arguments stay as prose)
+NON_PROSE = re.compile(rf'''
+    (?<!\\)%[^\n]*
+  | \$\$.*?\$\$ | (?<!\\)\$.*?(?<!\\)\$ | \\\[.*?\\\] | \\\(.*?\\\)
+  | \\begin\{{(equation|align|gather|multline|math|displaymath|verbatim|lstlisting)(\*?)\}}.*?\\end\{{\1\2\}}
+  | \\begin\{{[^{{}}]*\}}(?:\s*\[(?:[^\[\]{{}}]|{BRACED})*\]|\s*{BRACED})*
+  | \\(?:index|gls\w*|Gls\w*|label|\w*ref|\w*cite|url|href|input|include\w*|end|usepackage)\*?
+      (?:\[[^\]]*\])*{BRACED}
+  | \\[A-Za-z@]+\*? | \\.
+''', re.DOTALL | re.VERBOSE)
+
+# A word, or a break (punctuation, digits, blank line) no phrase may span
+PROSE_TOKEN = re.compile(r"(\d*[A-Za-z][A-Za-z0-9]*(?:['\u2019-][A-Za-z0-9]+)*)|\n[ \t]*\n|\S")
+
+STOPWORDS = frozenset("""
+a about above after again against all also an and any are as at be because been before being below
+between both but by can could did do does doing down during each either etc few for from further
+had has have having he her here hers him his how however i if in into is it its itself just may
+me might more most much must my no nor not now of off on once one only or other our out over own
+per same she should so some such than that the their them then there these they this those
+through to too two under until up upon us use used uses using very via was we well were what
+when where whether which while who whom why will with within without would yet you your
+""".split())
+
+# Technical term categories: {group name: [terms]}
+DEFAULT_PATTERNS_FILE = Path(__file__).resolve().parent / "technical_patterns.json"
+
+def load_technical_patterns(patterns_file=DEFAULT_PATTERNS_FILE) -> Tuple[re.Pattern, str]:
+    """Compile a patterns file into one case-insensitive alternation.
+
+    Each category becomes a named group matching its terms as whole words,
+    longest first, so match.lastgroup names the category. Earlier
+    categories win when two match at the same position. Returns the
+    pattern and the sha256 of the file.
+    """
+    with open(patterns_file, 'rb') as f:
+        source = f.read()
+    groups = []
+    for name, terms in json.loads(source).items():
+        if not name.isidentifier():
+            raise ValueError(f"{patterns_file}: category '{name}' is not a valid group name")
+        alternation = '|'.join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+        groups.append(f'(?P<{name}>{alternation})')
+    pattern = r'\b(?:' + '|'.join(groups) + r')\b'
+    return re.compile(pattern, re.IGNORECASE), hashlib.sha256(source).hexdigest()
+
+INDEX_ENTRY = re.compile(r'\\index\{([^}]+)\}')
+
+# Sentence ends, blank lines and sectioning commands (with their heading)
+# bound a context
+SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+|\n[ \t]*\n'
+                            r'|\\(?:part|chapter|(?:sub)*section|(?:sub)?paragraph)\*?'
+                            rf'(?:\[[^\]]*\])?{BRACED}')
+# Markup in contexts: \gls-style references and \gidx render as the name of
+# their glossary key (the other argument groups are dropped); commands whose
+# arguments are keys, other command names, comments and braces are dropped.
+# Escaped characters are unescaped; ~ and \\ become spaces.
+CONTEXT_MARKUP = re.compile(r'(?<!\\)%[^\n]*'
+                            r'|\\(?P<reference>gidx\w*|gls\w*|Gls\w*|GLS\w*)\*?(?:\[[^\]]*\])?'
+                            rf'\{{(?P<key>[^{{}}]*)\}}(?:{BRACED})*'
+                            rf'|\\(?:index|label|\w*ref|\w*cite)\*?(?:\[[^\]]*\])?(?:{BRACED})+'
+                            r'|\\(?P<escaped>[&%$_#{}])'
+                            r'|\\[A-Za-z@]+\*?|\\.|[{}~]', re.DOTALL)
+# glossaries commands that take a key but print nothing
+SILENT_REFERENCES = frozenset({'glsreset', 'glsunset', 'glsadd', 'glslocalreset', 'glslocalunset'})
+MAX_CONTEXT_CHARS = 300
+
+# Text just before a match that puts it inside a key argument, e.g. \glsreset{ocr}
+KEY_ARGUMENT = re.compile(r'\\(?:gls\w*|Gls\w*|index|label|\w*ref|\w*cite)\{[^{}]*$')
+
+# Sentences worth offering as a definition
+DEFINING_PHRASE = re.compile(r'\b(?:is|are) (?:a|an|the)\b|\brefers? to\b|\bstands for\b|\bis defined as\b',
+                             re.IGNORECASE)
+
+
+def decode_source(source: bytes) -> str:
+    """Chapter text as extraction offsets see it (undecodable bytes dropped)"""
+    return source.decode('utf-8', errors='ignore')
+
+
+def _plain_replacement(match: re.Match, names: Dict[str, str]) -> str:
+    if match.group('escaped'):
+        return match.group('escaped')
+    command = match.group('reference')
+    if command:
+        if command in SILENT_REFERENCES:
+            return ''
+        key = match.group('key')
+        name = names.get(key) or names.get(key.lower()) or key
+        if command.lower().startswith('glspl'):
+            name += 's'
+        if command.startswith('GLS'):
+            name = name.upper()
+        elif command.startswith('G'):
+            name = name[:1].upper() + name[1:]
+        return name
+    return ' ' if match.group() in ('~', '\\\\') else ''
+
+
+def plain_text(latex: str, names: Optional[Dict[str, str]] = None) -> str:
+    """Reduce LaTeX to plain text (see CONTEXT_MARKUP); collapse whitespace.
+
+    names maps glossary keys to the text a reference to them shows; a key
+    without a name is shown as itself.
+    """
+    names = names or {}
+    return ' '.join(CONTEXT_MARKUP.sub(lambda match: _plain_replacement(match, names), latex).split())
+
+
+LATEX_SPECIALS = {
+    '\\': r'\textbackslash{}', '&': r'\&', '%': r'\%', '$': r'\$', '#': r'\#', '_': r'\_',
+    '{': r'\{', '}': r'\}', '~': r'\textasciitilde{}', '^': r'\textasciicircum{}',
+}
+LATEX_SPECIAL = re.compile(r'[\\&%$#_{}~^]')
+
+
+def escape_latex(text: str) -> str:
+    """Escape plain text for LaTeX; one pass, so a backslash is never escaped twice"""
+    return LATEX_SPECIAL.sub(lambda match: LATEX_SPECIALS[match.group()], text)
+
+
+class Concordance:
+    """Keyword-in-context index: term key -> (file, start, end) occurrences.
+
+    Only character offsets are stored. The index is saved as a JSON
+    directory plus a packed uint32 array of (file, start, end) records
+    grouped by term. Each extraction run rebuilds and rewrites it (cached
+    per-chapter results make that cheap); --kwic queries open it with
+    load(), which memory-maps the records so a lookup reads just the
+    records of one term and the text around them.
+    """
+
+    def __init__(self):
+        self.files: List[Dict] = []
+        self.occurrences = defaultdict(list)
+        self.terms: Dict[str, Tuple[int, int]] = {}
+        self.records: Optional[memoryview] = None
+        # Glossary key -> name, for rendering \gls references in contexts
+        self.names: Dict[str, str] = {}
+        self._texts: Dict[int, str] = {}
+
+    def add_file(self, file_path: Path) -> int:
+        """Register a file and return its index for add()"""
+        stat = file_path.stat()
+        self.files.append({'path': str(file_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns})
+        return len(self.files) - 1
+
+    def add(self, key: str, file_index: int, start: int, end: int) -> None:
+        self.occurrences[key].append((file_index, start, end))
+
+    def positions(self, key: str, limit: Optional[int] = None) -> List[Tuple[int, int, int]]:
+        """Return up to limit (file, start, end) occurrences of key"""
+        if key in self.occurrences:
+            return self.occurrences[key][:limit]
+        if key not in self.terms:
+            return []
+        first, count = self.terms[key]
+        if limit is not None:
+            count = min(count, limit)
+        flat = self.records[3 * first:3 * (first + count)]
+        return [tuple(flat[i:i + 3]) for i in range(0, len(flat), 3)]
+
+    def save(self, index_file: str, records_file: str) -> None:
+        """Write the term directory (JSON) and, beside it, the records (uint32 triples)"""
+        records = array('I')
+        terms = {}
+        for key in sorted(self.occurrences):
+            terms[key] = (len(records) // 3, len(self.occurrences[key]))
+            for occurrence in self.occurrences[key]:
+                records.extend(occurrence)
+        with open(records_file, 'wb') as f:
+            records.tofile(f)
+        with open(index_file, 'w', encoding='utf-8') as f:
+            json.dump({'files': self.files, 'records': os.path.basename(records_file), 'terms': terms,
+                       'names': self.names}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, index_file: str) -> "Concordance":
+        """Open a saved concordance; records stay on disk, memory-mapped"""
+        with open(index_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        concordance = cls()
+        concordance.files = data['files']
+        concordance.terms = {key: tuple(value) for key, value in data['terms'].items()}
+        concordance.names = data.get('names', {})
+        records_file = os.path.join(os.path.dirname(index_file), data['records'])
+        if os.path.getsize(records_file):
+            with open(records_file, 'rb') as f:
+                concordance.records = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)).cast('I')
+        else:
+            concordance.records = memoryview(array('I'))
+        return concordance
+
+    def is_current(self, file_index: int) -> bool:
+        """True if the file still has the size and mtime it was indexed with"""
+        entry = self.files[file_index]
+        try:
+            stat = os.stat(entry['path'])
+        except OSError:
+            return False
+        return stat.st_size == entry['size'] and stat.st_mtime_ns == entry['mtime_ns']
+
+    def text(self, file_index: int) -> str:
+        if file_index not in self._texts:
+            with open(self.files[file_index]['path'], 'rb') as f:
+                self._texts[file_index] = decode_source(f.read())
+        return self._texts[file_index]
+
+    def sentence(self, file_index: int, start: int, end: int) -> str:
+        """Plain text of the sentence around one occurrence (or of its heading)"""
+        text = self.text(file_index)
+        first = max(0, start - MAX_CONTEXT_CHARS)
+        last = end + MAX_CONTEXT_CHARS
+        for match in SENTENCE_BREAK.finditer(text, first, last):
+            if match.end() <= start:
+                first = match.end()
+            elif match.start() >= end:
+                last = match.start()
+                break
+            elif match.group().startswith('\\'):
+                first, last = match.span()
+                break
+        return plain_text(text[first:last], self.names)
+
+    def contexts(self, key: str, limit: int = 5) -> List[str]:
+        """First limit distinct sentences using key, skipping files changed since indexing"""
+        found = []
+        for file_index, start, end in self.positions(key):
+            if not self.is_current(file_index):
+                continue
+            sentence = self.sentence(file_index, start, end)
+            if sentence and sentence not in found:
+                found.append(sentence)
+                if len(found) == limit:
+                    break
+        return found
+
+    def kwic(self, key: str, limit: int = 10, width: int = 40) -> List[Tuple[str, str, str, str]]:
+        """Return (file name, left, keyword, right) rows for the first limit occurrences"""
+        rows = []
+        for file_index, start, end in self.positions(key, limit):
+            if not self.is_current(file_index):
+                continue
+            text = self.text(file_index)
+            keyword = text[start:end]
+            entry = INDEX_ENTRY.fullmatch(keyword)
+            if entry:
+                keyword = entry.group(1)
+            left = plain_text(text[max(0, start - 4 * width):start], self.names)[-width:]
+            right = plain_text(text[end:end + 4 * width], self.names)[:width]
+            rows.append((Path(self.files[file_index]['path']).name, left, keyword, right))
+        return rows
+
 
 class GlossaryExtractor:
-    def __init__(self, chapters_dir: str = "Chapters"):
+    def __init__(self, chapters_dir: str = "Chapters", candidate_count: int = 100,
+                 jobs: int = 1, cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+                 patterns_file=DEFAULT_PATTERNS_FILE):
         self.chapters_dir = Path(chapters_dir)
+        self.technical_pattern, self.patterns_sha256 = load_technical_patterns(patterns_file)
+        self.candidate_count = candidate_count
+        self.jobs = jobs
+        self.cache_dir = cache_dir
         self.existing_glossary = {}
         self.index_terms = defaultdict(set)
         self.content_terms = defaultdict(set)
         self.definitions = {}
+        self.concordance = Concordance()
+        # Candidate mining: words get integer ids (0 is a phrase break),
+        # n-grams are tuples of ids
+        self.token_ids = {'': 0}
+        self.tokens = ['']
+        self.acronym_counts = Counter()
+        self.ngram_counts = Counter()
+        self.ngram_chapters = Counter()
 
     def load_existing_glossary(self, glossary_file: str = "glossary_terms.json"):
         """Load existing glossary terms if file exists"""
@@ -25,12 +315,16 @@ class GlossaryExtractor:
             with open(glossary_file, 'r', encoding='utf-8') as f:
                 self.existing_glossary = json.load(f)
                 print(f"Loaded {len(self.existing_glossary)} existing terms")
+        self.concordance.names = {key: data['variants'][0].split('!')[0]
+                                  for key, data in self.existing_glossary.items() if data.get('variants')}
 
     def extract_index_terms(self, content: str) -> List[str]:
         """Extract all \index{} entries from LaTeX content"""
-        pattern = r'\\index\{([^}]+)\}'
-        matches = re.findall(pattern, content)
-        return matches
+        return [term for term, _, _ in self.find_index_terms(content)]
+
+    def find_index_terms(self, content: str) -> List[Tuple[str, int, int]]:
+        """Return (entry, start, end) for each \index{} command"""
+        return [(m.group(1), m.start(), m.end()) for m in INDEX_ENTRY.finditer(content)]
 
     def normalize_term_key(self, term: str) -> str:
         """Create normalized key for glossary term"""
@@ -45,27 +339,103 @@ class GlossaryExtractor:
 
     def extract_content_terms(self, content: str) -> Set[str]:
         """Extract potential glossary terms from content"""
-        # Common technical terms that should be in glossary
-        technical_patterns = [
-            r'\b(?:API|SDK|IDE|GUI|CLI|USB|HDMI|WiFi|Bluetooth)\b',
-            r'\b(?:artificial intelligence|machine learning|neural network)\b',
-            r'\b(?:accessibility|inclusive design|universal design)\b',
-            r'\b(?:screen reader|voice over|narrator|JAWS|NVDA)\b',
-            r'\b(?:braille|tactile|haptic|audio)\b',
-            r'\b(?:magnification|zoom|enlargement)\b',
-            r'\b(?:navigation|orientation|mobility)\b',
-            r'\b(?:OCR|optical character recognition)\b',
-            r'\b(?:TTS|text-to-speech|speech synthesis)\b',
-            r'\b(?:PDF|HTML|XML|LaTeX|MathML)\b',
-            r'\b(?:WCAG|Section 508|ADA)\b'
-        ]
-
-        terms = set()
-        for pattern in technical_patterns:
-            matches = re.findall(pattern, content, re.IGNORECASE)
-            terms.update(match.lower() for match in matches)
-
-        return terms
+        return {term for term, _, _, _ in self.find_content_terms(content)}
+
+    def find_content_terms(self, content: str) -> List[Tuple[str, str, int, int]]:
+        """Return (lowercased term, category, start, end) for each technical term in content"""
+        return [(match.group().lower(), match.lastgroup, match.start(), match.end())
+                for match in self.technical_pattern.finditer(content)]
+
+    def tokenize_prose(self, content: str) -> Tuple[List[int], List[str], Counter]:
+        """Return (word ids, words, acronym counts) for the prose in content.
+
+        Ids index into words, a vocabulary local to this file; id 0 ('')
+        marks a break no phrase may span.
+        """
+        token_ids = {'': 0}
+        words = ['']
+        acronyms = Counter()
+        ids = [0]
+        for match in PROSE_TOKEN.finditer(NON_PROSE.sub(' . ', content)):
+            word = match.group(1)
+            if word:
+                folded = word.lower()
+                token_id = token_ids.get(folded)
+                if token_id is None:
+                    token_id = token_ids[folded] = len(words)
+                    words.append(folded)
+                if len(word) > 1 and word.isupper():
+                    acronyms[token_id] += 1
+                ids.append(token_id)
+            elif ids[-1]:
+                ids.append(0)
+        return ids, words, acronyms
+
+    def count_ngrams(self, content: str) -> Tuple[Dict[Tuple[int, ...], int], List[str], Counter]:
+        """Count 1- to MAX_NGRAM-word sequences in one file's prose.
+
+        Returns the counts keyed by tuples of local word ids, the words and
+        the acronym counts, as from tokenize_prose.
+        """
+        ids, words, acronyms = self.tokenize_prose(content)
+        counts = Counter()
+        # Count every window in C, then drop those spanning a break
+        for n in range(1, MAX_NGRAM + 1):
+            counts.update(zip(*(ids[i:] for i in range(n))))
+        return {ngram: count for ngram, count in counts.items() if 0 not in ngram}, words, acronyms
+
+    def token_id(self, word: str) -> int:
+        """Run-wide id of word (0 for the break marker '')"""
+        token_id = self.token_ids.get(word)
+        if token_id is None:
+            token_id = self.token_ids[word] = len(self.tokens)
+            self.tokens.append(word)
+        return token_id
+
+    def mine_candidates(self, limit: int, min_count: int = 3, min_chapters: int = 2) -> List[Dict]:
+        """Rank frequent phrases that are not yet glossary or index terms.
+
+        Score is occurrences times the number of chapters using the phrase.
+        Single words are only proposed when mostly written as an acronym,
+        or when hyphenated. A phrase that only ever occurs inside one
+        longer candidate is left out in favour of the longer one.
+        """
+        stop_ids = {self.token_ids[w] for w in STOPWORDS if w in self.token_ids}
+        eligible = {}
+        for ngram, count in self.ngram_counts.items():
+            if (count < min_count or ngram[0] in stop_ids or ngram[-1] in stop_ids
+                    or self.ngram_chapters[ngram] < min_chapters):
+                continue
+            if (len(ngram) == 1 and '-' not in self.tokens[ngram[0]]
+                    and 2 * self.acronym_counts[ngram[0]] < count):
+                continue
+            eligible[ngram] = count
+
+        subsumed = set()
+        for ngram, count in eligible.items():
+            for n in range(1, len(ngram)):
+                for start in range(len(ngram) - n + 1):
+                    part = ngram[start:start + n]
+                    if eligible.get(part) == count:
+                        subsumed.add(part)
+
+        known = set(self.existing_glossary) | set(self.index_terms) | set(self.content_terms)
+        for entry in self.existing_glossary.values():
+            known.update(self.normalize_term_key(v) for v in entry.get('variants', []))
+
+        candidates = []
+        for ngram, count in eligible.items():
+            if ngram in subsumed:
+                continue
+            term = ' '.join(self.tokens[i] for i in ngram)
+            key = self.normalize_term_key(term)
+            if key in known or (key.endswith('s') and key[:-1] in known):
+                continue
+            chapters = self.ngram_chapters[ngram]
+            candidates.append({'term': term, 'key': key, 'count': count,
+                               'chapters': chapters, 'score': count * chapters})
+        candidates.sort(key=lambda c: (-c['score'], -c['chapters'], c['term']))
+        return candidates[:limit]
 
     def infer_definition(self, term: str, contexts: List[str]) -> str:
         """Infer definition from context around term usage"""
@@ -103,38 +473,100 @@ class GlossaryExtractor:
             'cli': 'Command Line Interface - text-based interface for operating systems'
         }
 
-        return definitions.get(term, f"A technical term related to assistive technology and accessibility")
+        if term in definitions:
+            return definitions[term]
+        # Otherwise use the first sentence from the chapters that reads like a
+        # definition. One that starts with punctuation or with the defining
+        # phrase lost its subject to markup that prints nothing (a bare \index{})
+        for context in contexts:
+            match = DEFINING_PHRASE.search(context)
+            if match and match.start() > 0 and context[:1].isalnum():
+                return context
+        return "A technical term related to assistive technology and accessibility"
+
+    def extract_file(self, content: str) -> Dict:
+        """Everything one chapter contributes, independent of other chapters.
+
+        This is the unit that is cached by content hash and computed in
+        worker processes; merge_file_result() folds it into the run.
+        """
+        index_terms = self.find_index_terms(content)
+        content_terms = self.find_content_terms(content)
+        contexts = [(self.normalize_term_key(term), start, end) for term, start, end in index_terms]
+        contexts.extend((self.normalize_term_key(term), start, end) for term, _, start, end in content_terms
+                        if not KEY_ARGUMENT.search(content, max(0, start - 80), start))
+        ngrams, words, acronyms = self.count_ngrams(content)
+        return {
+            'index_terms': [term for term, _, _ in index_terms],
+            'content_terms': sorted({term for term, _, _, _ in content_terms}),
+            'contexts': contexts,
+            'words': words,
+            'ngrams': ngrams,
+            'acronyms': acronyms,
+        }
 
-    def process_file(self, file_path: Path) -> None:
-        """Process a single LaTeX file"""
+    def merge_file_result(self, file_path: Path, result: Dict) -> None:
+        """Add one chapter's extraction result to the run-wide tables"""
+        file_index = self.concordance.add_file(file_path)
+        for term in result['index_terms']:
+            self.index_terms[self.normalize_term_key(term)].add(term)
+        for term in result['content_terms']:
+            self.content_terms[self.normalize_term_key(term)].add(term)
+        for key, start, end in result['contexts']:
+            self.concordance.add(key, file_index, start, end)
+
+        # Map the file's word ids onto run-wide ids
+        remap = [self.token_id(word) for word in result['words']]
+        ngrams = {tuple(map(remap.__getitem__, ngram)): count for ngram, count in result['ngrams'].items()}
+        self.ngram_counts.update(ngrams)
+        self.ngram_chapters.update(ngrams.keys())
+        for token_id, count in result['acronyms'].items():
+            self.acronym_counts[remap[token_id]] += count
+
+    def process_file(self, file_path: Path, result: Optional[Dict] = None) -> None:
+        """Process a single LaTeX file, or merge its already extracted result"""
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-
-            # Extract index terms
-            index_terms = self.extract_index_terms(content)
-            for term in index_terms:
-                key = self.normalize_term_key(term)
-                self.index_terms[key].add(term)
-
-            # Extract content terms
-            content_terms = self.extract_content_terms(content)
-            for term in content_terms:
-                key = self.normalize_term_key(term)
-                self.content_terms[key].add(term)
-
-            print(f"Processed {file_path.name}: {len(index_terms)} index terms, {len(content_terms)} content terms")
+            if result is None:
+                result = _extract_task(self, file_path)
+            self.merge_file_result(file_path, result)
+            print(f"Processed {file_path.name}: {len(result['index_terms'])} index terms, "
+                  f"{len(result['content_terms'])} content terms")
 
         except Exception as e:
             print(f"Error processing {file_path}: {e}")
 
     def process_all_files(self) -> None:
-        """Process all LaTeX files in the chapters directory"""
-        tex_files = list(self.chapters_dir.glob("*.tex"))
+        """Process all LaTeX files in the chapters directory.
+
+        Results of unchanged files come from the cache; the rest are
+        extracted in up to self.jobs worker processes. Results are merged
+        in file order, so the outcome does not depend on jobs.
+        """
+        tex_files = sorted(self.chapters_dir.glob("*.tex"))
         print(f"Found {len(tex_files)} LaTeX files")
 
+        results = {}
+        if self.cache_dir is not None:
+            for file_path in tex_files:
+                cached = read_entry(file_path.read_bytes(), CACHE_NAMESPACE, self.cache_version(), self.cache_dir)
+                if cached is not None:
+                    results[file_path] = cached
+            print(f"Reusing cached results for {len(results)} unchanged files")
+
+        pending = [file_path for file_path in tex_files if file_path not in results]
+        for file_path, result, error in map_files(self, _extract_task, pending, self.jobs):
+            if error:
+                print(f"Error processing {file_path}: {error}")
+            else:
+                results[file_path] = result
+
         for file_path in tex_files:
-            self.process_file(file_path)
+            if file_path in results:
+                self.process_file(file_path, results[file_path])
+
+    def cache_version(self) -> str:
+        """Cached results depend on the extractor version and the pattern set"""
+        return f"{EXTRACTION_VERSION}-{self.patterns_sha256}"
 
     def build_glossary(self) -> Dict:
         """Build comprehensive glossary from extracted terms"""
@@ -155,7 +587,7 @@ class GlossaryExtractor:
             else:
                 # Create new entry
                 variants = sorted(list(self.index_terms[key] | self.content_terms[key]))
-                definition = self.infer_definition(key, [])
+                definition = self.infer_definition(key, self.concordance.contexts(key))
 
                 glossary[key] = {
                     'variants': variants,
@@ -170,6 +602,18 @@ class GlossaryExtractor:
             json.dump(glossary, f, indent=2, ensure_ascii=False, sort_keys=True)
         print(f"Saved {len(glossary)} terms to {output_file}")
 
+    def save_candidates(self, candidates: List[Dict], output_file: str = "glossary_candidates.json") -> None:
+        """Save proposed glossary terms to JSON file"""
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(candidates, f, indent=2, ensure_ascii=False)
+        print(f"Saved {len(candidates)} candidate terms to {output_file}")
+
+    def save_concordance(self, index_file: str = "glossary_concordance.json",
+                         records_file: str = "glossary_concordance.bin") -> None:
+        """Save the keyword-in-context index for later --kwic queries"""
+        self.concordance.save(index_file, records_file)
+        print(f"Saved contexts for {len(self.concordance.occurrences)} terms to {index_file}")
+
     def generate_latex_definitions(self, glossary: Dict) -> str:
         """Generate LaTeX \newglossaryentry commands"""
         latex_entries = []
@@ -180,8 +624,8 @@ class GlossaryExtractor:
             description = data['definition']
 
             # Escape LaTeX special characters
-            name = name.replace('&', '\\&').replace('%', '\\%').replace('$', '\\$')
-            description = description.replace('&', '\\&').replace('%', '\\%').replace('$', '\\$')
+            name = escape_latex(name)
+            description = escape_latex(description)
 
             entry = f"\\newglossaryentry{{{key}}}{{\n    name={{{name}}},\n    description={{{description}}}\n}}"
             latex_entries.append(entry)
@@ -203,6 +647,8 @@ class GlossaryExtractor:
 
         # Save results
         self.save_glossary(glossary)
+        self.save_candidates(self.mine_candidates(self.candidate_count))
+        self.save_concordance()
 
         # Generate LaTeX definitions
         latex_defs = self.generate_latex_definitions(glossary)
@@ -221,6 +667,53 @@ class GlossaryExtractor:
         for key, count in term_counts[:20]:
             print(f"  {key}: {count} variants")
 
+CACHE_NAMESPACE = "GlossaryExtractor"
+
+def _extract_task(extractor: GlossaryExtractor, file_path: Path) -> Dict:
+    """Extract one file and cache the result under its content hash"""
+    source = file_path.read_bytes()
+    result = extractor.extract_file(decode_source(source))
+    if extractor.cache_dir is not None:
+        write_entry(source, CACHE_NAMESPACE, extractor.cache_version(), extractor.cache_dir, result)
+    return result
+
+def show_contexts(term: str, limit: int, index_file: str = "glossary_concordance.json") -> int:
+    """Print keyword-in-context rows for term from a saved concordance"""
+    if not os.path.exists(index_file):
+        print(f"No concordance at {index_file}; run the extraction first")
+        return 1
+    concordance = Concordance.load(index_file)
+    key = GlossaryExtractor().normalize_term_key(term)
+    rows = concordance.kwic(key, limit)
+    if not rows:
+        print(f"No contexts for '{term}' (key '{key}')")
+        return 1
+    for name, left, keyword, right in rows:
+        print(f"{name:>16}  {left:>40} [{keyword}] {right}")
+    if any(not concordance.is_current(i) for i in range(len(concordance.files))):
+        print("Note: some chapters changed since indexing; re-run the extraction to refresh")
+    return 0
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Extract glossary terms from LaTeX chapters")
+    parser.add_argument("--chapters-dir", default="Chapters", help="Directory of chapter .tex files")
+    parser.add_argument("--candidates", type=int, default=100,
+                        help="Number of proposed terms to write to glossary_candidates.json")
+    parser.add_argument("--kwic", metavar="TERM",
+                        help="Show contexts for TERM from the saved concordance instead of extracting")
+    parser.add_argument("--limit", type=int, default=10, help="Contexts to show with --kwic")
+    parser.add_argument("--patterns", type=Path, default=DEFAULT_PATTERNS_FILE,
+                        help="Technical term categories, as JSON {category: [terms]}")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Number of worker processes for changed chapters (default: all cores)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help=f"Extract every chapter without reading or writing {DEFAULT_CACHE_DIR}/")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    extractor = GlossaryExtractor()
+    args = parse_args()
+    if args.kwic:
+        raise SystemExit(show_contexts(args.kwic, args.limit))
+    extractor = GlossaryExtractor(args.chapters_dir, args.candidates, args.jobs,
+                                  None if args.no_cache else DEFAULT_CACHE_DIR, args.patterns)
     extractor.run()
@@ -4,19 +4,156 @@ LaTeX Glossary Command Insertion Script
 Inserts \gls{} commands into LaTeX files based on glossary terms
 """
 
+import argparse
+import csv
 import json
 import re
-import os
+import sys
+import time
+from bisect import bisect_right
+from collections import Counter
 from pathlib import Path
-from typing import Dict, List, Set, Tuple
-import shutil
+from typing import Dict, List, Optional, Set, Tuple
+
+# The shared term matcher and snapshot store live with the indexing scripts
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+from snapshot_store import SnapshotStore
+from term_matcher import TermMatcher
+
+# Whitespace that normalizing changes: runs of two or more, or a lone non-space
+WHITESPACE_RUN = re.compile(r'\s{2,}|[^\S ]')
+# A blank line inside a run; terms never match across a paragraph break
+PARAGRAPH_BREAK = re.compile(r'\n[ \t]*\n')
+
+
+def normalize_whitespace(text: str) -> Tuple[str, List[int], List[int]]:
+    """Collapse whitespace runs so terms match across line wraps.
+
+    A run containing a paragraph break becomes one newline, which no term
+    contains, so a term never matches across paragraphs; any other run
+    (spaces, a single newline) becomes one space. Returns the normalized
+    view plus parallel lists of segment starts in the view and in the
+    original text; offsets inside a segment map linearly.
+
+    >>> normalize_whitespace('braille\\n  display')[0]
+    'braille display'
+    >>> normalize_whitespace('braille\\n\\n\\ndisplay')[0]
+    'braille\\ndisplay'
+    """
+    pieces = []
+    view_starts = [0]
+    orig_starts = [0]
+    last = 0
+    view_pos = 0
+    for match in WHITESPACE_RUN.finditer(text):
+        pieces.append(text[last:match.start()])
+        pieces.append('\n' if PARAGRAPH_BREAK.search(match.group()) else ' ')
+        view_pos += match.start() - last
+        view_starts.append(view_pos)
+        orig_starts.append(match.start())
+        view_pos += 1
+        view_starts.append(view_pos)
+        orig_starts.append(match.end())
+        last = match.end()
+    pieces.append(text[last:])
+    return ''.join(pieces), view_starts, orig_starts
+
+
+# Commands (starred or not) and table options whose arguments must not
+# receive \gls{} commands, plus comments. Commands taking a glossary key
+# match as KEY_ARGUMENT does in extract_glossary_terms.py.
+STRUCTURAL_COMMAND = re.compile(
+    r'\\(?:chapter|section|subsection|subsubsection|paragraph|subparagraph|part|title|'
+    r'author|date|caption|label|\w*ref|\w*cite|index|gidx\w*|gls\w*|Gls\w*|GLS\w*|footnote|href|url|'
+    r'textbf|textit|emph)\*?(?=[\[{])'
+    r'|\\item(?=\[)'
+    r'|\b(?:caption|label)\s*=\s*(?=\{)'  # longtblr options
+    r'|(?<!\\)%'
+)
+ARGUMENT_TOKEN = re.compile(r'\\.|[{}\]]', re.DOTALL)
+EXISTING_GLS = re.compile(r'\\gls\{([^}]*)\}')
+
+
+def _argument_end(text: str, start: int) -> int:
+    """Return the offset just past the {...} or [...] group opened at start."""
+    depth = 0
+    for token in ARGUMENT_TOKEN.finditer(text, start + 1):
+        ch = token.group()
+        if ch == '{':
+            depth += 1
+        elif ch == '}':
+            if depth == 0 and text[start] == '{':
+                return token.end()
+            depth -= 1
+        elif ch == ']' and depth == 0 and text[start] == '[':
+            return token.end()
+    return len(text)
+
+
+def find_protected_spans(text: str) -> List[Tuple[int, int]]:
+    """Return the sorted spans of structural command arguments and comments.
+
+    A command's span runs from its backslash through every directly following
+    {...} or [...] argument, with nested braces; a comment runs to the end of
+    its line. Commands inside a protected span are part of it.
+    """
+    spans = []
+    position = 0
+    while True:
+        match = STRUCTURAL_COMMAND.search(text, position)
+        if match is None:
+            return spans
+        if match.group() == '%':
+            end = text.find('\n', match.start())
+            end = len(text) if end < 0 else end
+        else:
+            end = match.end()
+            while end < len(text) and text[end] in '{[':
+                end = _argument_end(text, end)
+        spans.append((match.start(), end))
+        position = end
+
+
+class ProgressBar:
+    """One-line progress display on stderr, redrawn at most every interval seconds"""
+
+    def __init__(self, total: int, interval: float = 0.25, width: int = 30):
+        self.total = total
+        self.interval = interval
+        self.width = width
+        self._last_draw = 0.0
+
+    def update(self, done: int, label: str = ""):
+        now = time.monotonic()
+        if done < self.total and now - self._last_draw < self.interval:
+            return
+        self._last_draw = now
+        filled = self.width * done // self.total if self.total else self.width
+        bar = '#' * filled + '.' * (self.width - filled)
+        sys.stderr.write(f"\r[{bar}] {done}/{self.total} {label[:40]:<40}")
+        sys.stderr.flush()
+
+    def close(self):
+        sys.stderr.write("\n")
+        sys.stderr.flush()
+
 
 class GlossaryInserter:
-    def __init__(self, glossary_file: str = "glossary_terms.json", chapters_dir: str = "Chapters"):
+    def __init__(self, glossary_file: str = "glossary_terms.json", chapters_dir: str = "Chapters",
+                 whole_file: bool = False, quiet: bool = False, progress: bool = False,
+                 report_file: str = "glossary_insertions.jsonl", snapshot_dir: Optional[str] = None):
         self.glossary_file = glossary_file
         self.chapters_dir = Path(chapters_dir)
+        self.whole_file = whole_file  # Match on the whole file, across line wraps
+        self.quiet = quiet
+        self.progress = progress  # Progress bar instead of per-file output
+        self.report_file = report_file  # .csv for CSV (+ .summary.csv), otherwise JSONL
+        self.events = []  # (file, line, column, key, matched text) per insertion
+        self.snapshots = SnapshotStore(snapshot_dir).begin("insert_glossary_commands")
         self.glossary = {}
         self.term_mapping = {}  # Maps variant text to canonical key
+        self.matcher = None  # Aho-Corasick automaton over term_mapping
+        self.pattern_keys = []  # Canonical key per matcher pattern id
         self.files_processed = set()
 
     def load_glossary(self):
@@ -32,160 +169,148 @@ class GlossaryInserter:
                 if clean_variant:
                     self.term_mapping[clean_variant.lower()] = key
 
-        print(f"Loaded {len(self.glossary)} glossary terms with {len(self.term_mapping)} variants")
-
-    def backup_file(self, file_path: Path) -> Path:
-        """Create backup of original file"""
-        backup_path = file_path.with_suffix(file_path.suffix + '.backup')
-        shutil.copy2(file_path, backup_path)
-        return backup_path
-
-    def is_structural_command(self, line: str) -> bool:
-        """Check if line contains structural LaTeX commands where \gls{} should not be inserted"""
-        structural_patterns = [
-            r'\\chapter\{',
-            r'\\section\{',
-            r'\\subsection\{',
-            r'\\subsubsection\{',
-            r'\\paragraph\{',
-            r'\\subparagraph\{',
-            r'\\part\{',
-            r'\\title\{',
-            r'\\author\{',
-            r'\\date\{',
-            r'\\caption\{',
-            r'\\label\{',
-            r'\\ref\{',
-            r'\\cite\{',
-            r'\\index\{',
-            r'\\footnote\{',
-            r'\\href\{',
-            r'\\url\{',
-            r'\\textbf\{',
-            r'\\textit\{',
-            r'\\emph\{',
-            r'\\item\[',
-        ]
-
-        for pattern in structural_patterns:
-            if re.search(pattern, line):
-                return True
-        return False
-
-    def find_term_in_text(self, text: str, term: str) -> List[Tuple[int, int, str]]:
-        """Find all occurrences of term in text, returning (start, end, matched_text)"""
-        matches = []
-
-        # Create regex pattern for the term (case insensitive, word boundaries)
-        pattern = r'\b' + re.escape(term) + r'\b'
-
-        for match in re.finditer(pattern, text, re.IGNORECASE):
-            matches.append((match.start(), match.end(), match.group()))
-
-        return matches
-
-    def insert_gls_in_line(self, line: str, used_terms: Set[str]) -> Tuple[str, Set[str]]:
-        """Insert \gls{} commands in a single line, avoiding structural commands"""
-
-        # Skip if this is a structural command line
-        if self.is_structural_command(line):
-            return line, used_terms
-
-        # Skip if line already contains \gls{} commands
-        if r'\gls{' in line:
-            return line, used_terms
-
-        # Skip comment lines
-        if line.strip().startswith('%'):
-            return line, used_terms
-
-        modified_line = line
-        offset = 0  # Track position changes due to insertions
-        line_used_terms = set()
-
-        # Find all potential terms in this line, sorted by position
-        all_matches = []
+        # Compile every variant into one automaton, scanned once per line
+        self.matcher = TermMatcher(self.term_mapping)
+        self.pattern_keys = [None] * len(self.matcher.patterns)
         for variant, key in self.term_mapping.items():
-            matches = self.find_term_in_text(line, variant)
-            for start, end, matched_text in matches:
-                all_matches.append((start, end, matched_text, variant, key))
-
-        # Sort by position (earliest first)
-        all_matches.sort(key=lambda x: x[0])
-
-        # Process matches, avoiding overlaps and limiting to first occurrence per file
-        for start, end, matched_text, variant, key in all_matches:
-            # Skip if we've already used this term in this file
-            if key in used_terms:
-                continue
-
-            # Skip if this would overlap with a previous insertion
-            adjusted_start = start + offset
-            adjusted_end = end + offset
-
-            # Check if this position is still valid after previous insertions
-            if adjusted_start >= len(modified_line) or modified_line[adjusted_start:adjusted_end] != matched_text:
-                continue
-
-            # Insert \gls{} command
-            gls_command = f"\\gls{{{key}}}"
-            modified_line = modified_line[:adjusted_start] + gls_command + modified_line[adjusted_end:]
-
-            # Update offset for future insertions
-            offset += len(gls_command) - len(matched_text)
-
-            # Mark this term as used
-            line_used_terms.add(key)
-
-            print(f"  Inserted \\gls{{{key}}} for '{matched_text}'")
-
-        return modified_line, line_used_terms
+            self.pattern_keys[self.matcher.pattern_id(variant)] = key
+
+        self._log(f"Loaded {len(self.glossary)} glossary terms with {len(self.term_mapping)} variants")
+
+    def _log(self, message: str):
+        """Print progress messages unless quiet or showing a progress bar"""
+        if not (self.quiet or self.progress):
+            print(message)
+
+    def insert_gls_in_line(self, line: str, used_terms: Set[str],
+                           found: Optional[List[Tuple[int, str, str]]] = None) -> Tuple[str, Set[str]]:
+        """Insert \gls{} commands in a single line, outside structural command arguments"""
+        return self._insert_gls(line, used_terms, False, found)
+
+    def insert_gls_in_text(self, text: str,
+                           found: Optional[List[Tuple[int, str, str]]] = None) -> Tuple[str, Set[str]]:
+        """Insert \gls{} commands in a whole file, matching across line wraps"""
+        return self._insert_gls(text, set(), True, found)
+
+    def _insert_gls(self, text: str, used_terms: Set[str], normalize: bool,
+                    found: Optional[List[Tuple[int, str, str]]]) -> Tuple[str, Set[str]]:
+        """Insert \gls{} commands in the gaps between protected spans.
+
+        Returns the new text and the keys inserted. Terms already wrapped in
+        \gls{} in the text count as used; with normalize, each gap is
+        matched on its whitespace-normalized view. Each insertion is
+        appended to found as (offset, key, matched text) if given.
+        """
+        used_terms = used_terms | set(EXISTING_GLS.findall(text))
+        pieces = []
+        last_end = 0
+        inserted = set()
+
+        # Protected spans start with a backslash or % and end with a closing
+        # bracket or a line end, so scanning each gap on its own finds the
+        # same word-bounded matches as scanning the whole text
+        gaps = []
+        gap_start = 0
+        for span_start, span_end in find_protected_spans(text):
+            if span_start > gap_start:
+                gaps.append((gap_start, span_start))
+            gap_start = span_end
+        if gap_start < len(text):
+            gaps.append((gap_start, len(text)))
+
+        for gap_start, gap_end in gaps:
+            if normalize:
+                view, view_starts, orig_starts = normalize_whitespace(text[gap_start:gap_end])
+            else:
+                view, view_starts, orig_starts = text[gap_start:gap_end], [0], [0]
+
+            def to_original(position: int) -> int:
+                idx = bisect_right(view_starts, position) - 1
+                return gap_start + orig_starts[idx] + position - view_starts[idx]
+
+            def unused(start: int, end: int, pid: int) -> bool:
+                key = self.pattern_keys[pid]
+                return key not in used_terms and key not in inserted
+
+            # Leftmost-longest, non-overlapping matches; only the first
+            # occurrence of each term in the file gets a \gls{} command, and
+            # where the longest match's term is used a shorter one may match
+            for start, end, pid in self.matcher.iter_longest(view, unused):
+                key = self.pattern_keys[pid]
+                orig_start = to_original(start)
+                pieces.append(text[last_end:orig_start])
+                pieces.append(f"\\gls{{{key}}}")
+                last_end = to_original(end - 1) + 1
+                inserted.add(key)
+
+                if found is not None:
+                    found.append((orig_start, key, view[start:end]))
+
+        if not pieces:
+            return text, inserted
+        pieces.append(text[last_end:])
+        return ''.join(pieces), inserted
 
     def process_file(self, file_path: Path) -> bool:
         """Process a single LaTeX file"""
-        print(f"\nProcessing {file_path.name}...")
-
-        # Create backup
-        backup_path = self.backup_file(file_path)
-        print(f"  Created backup: {backup_path.name}")
+        self._log(f"\nProcessing {file_path.name}...")
+        self.files_processed.add(str(file_path))
 
+        events = []
         try:
-            # Read file
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()
-
-            # Track terms used in this file
-            used_terms = set()
-            modified_lines = []
-            insertions_made = 0
-
-            # Process each line
-            for i, line in enumerate(lines):
-                modified_line, line_used_terms = self.insert_gls_in_line(line, used_terms)
-                modified_lines.append(modified_line)
-
-                # Update used terms
-                used_terms.update(line_used_terms)
-                if line_used_terms:
-                    insertions_made += len(line_used_terms)
+            if self.whole_file:
+                # Process the file as one buffer
+                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                    content = f.read()
+                found = []
+                modified_content, used_terms = self.insert_gls_in_text(content, found)
+                insertions_made = len(used_terms)
+
+                line_starts = [0] + [m.end() for m in re.finditer('\n', content)]
+                for offset, key, text in found:
+                    line = bisect_right(line_starts, offset)
+                    events.append((str(file_path), line, offset - line_starts[line - 1] + 1, key, text))
+            else:
+                # Read file
+                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                    lines = f.readlines()
+
+                # Track terms used in this file, including existing \gls{} commands
+                used_terms = set(EXISTING_GLS.findall(''.join(lines)))
+                modified_lines = []
+                insertions_made = 0
+
+                # Process each line
+                for i, line in enumerate(lines, 1):
+                    found = []
+                    modified_line, line_used_terms = self.insert_gls_in_line(line, used_terms, found)
+                    modified_lines.append(modified_line)
+                    events.extend((str(file_path), i, offset + 1, key, text) for offset, key, text in found)
+
+                    # Update used terms
+                    used_terms.update(line_used_terms)
+                    if line_used_terms:
+                        insertions_made += len(line_used_terms)
+                modified_content = ''.join(modified_lines)
 
             # Write modified file if changes were made
             if insertions_made > 0:
+                # Snapshot the original before overwriting it
+                self.snapshots.snapshot(file_path)
                 with open(file_path, 'w', encoding='utf-8') as f:
-                    f.writelines(modified_lines)
-                print(f"  Made {insertions_made} glossary insertions")
+                    f.write(modified_content)
+                self.events.extend(events)
+                self._log(f"  Made {insertions_made} glossary insertions")
                 return True
             else:
-                print(f"  No glossary terms found to insert")
-                # Remove backup if no changes made
-                backup_path.unlink()
+                self._log(f"  No glossary terms found to insert")
                 return False
 
         except Exception as e:
             print(f"  Error processing {file_path}: {e}")
-            # Restore from backup on error
-            if backup_path.exists():
-                shutil.copy2(backup_path, file_path)
+            # Restore from the snapshot on error
+            if file_path in self.snapshots:
+                self.snapshots.restore_file(file_path)
             return False
 
     def create_preamble_file(self, output_file: str = "glossary_preamble.tex"):
@@ -224,7 +349,7 @@ class GlossaryInserter:
         with open(output_file, 'w', encoding='utf-8') as f:
             f.write('\n'.join(preamble_lines))
 
-        print(f"Created glossary preamble file: {output_file}")
+        self._log(f"Created glossary preamble file: {output_file}")
 
     def _escape_latex(self, text: str) -> str:
         """Escape special LaTeX characters"""
@@ -262,25 +387,76 @@ class GlossaryInserter:
                 "Appendix04.tex", "Appendix05.tex", "Appendix06.tex"
             ]
 
-        total_files = 0
-        successful_files = 0
-
+        file_paths = []
         for filename in file_list:
             file_path = self.chapters_dir / filename
             if file_path.exists():
-                total_files += 1
-                if self.process_file(file_path):
-                    successful_files += 1
+                file_paths.append(file_path)
             else:
                 print(f"Warning: File not found: {file_path}")
 
-        print(f"\nProcessing complete:")
-        print(f"  Total files processed: {total_files}")
-        print(f"  Files with glossary insertions: {successful_files}")
+        successful_files = 0
+        bar = ProgressBar(len(file_paths)) if self.progress and not self.quiet else None
+        for done, file_path in enumerate(file_paths, 1):
+            if self.process_file(file_path):
+                successful_files += 1
+            if bar:
+                bar.update(done, file_path.name)
+        if bar:
+            bar.close()
+
+        if not self.quiet:
+            print(f"\nProcessing complete:")
+            print(f"  Total files processed: {len(file_paths)}")
+            print(f"  Files with glossary insertions: {successful_files}")
+            print(f"  Total insertions: {len(self.events)}")
+
+    def summarize(self) -> Dict:
+        """Summary counts over the recorded insertion events"""
+        by_file = Counter(event[0] for event in self.events)
+        by_key = Counter(event[3] for event in self.events)
+        return {
+            "files_processed": len(self.files_processed),
+            "files_with_insertions": len(by_file),
+            "insertions": len(self.events),
+            "by_file": dict(sorted(by_file.items())),
+            "by_key": dict(by_key.most_common()),
+        }
+
+    def write_report(self, report_file: Optional[str] = None) -> Dict:
+        """Write the insertion events and summary counts; return the summary.
+
+        JSONL: one object per event, then a final {"summary": ...} object.
+        CSV: the events in report_file, and the summary beside it in
+        <name>.summary.csv as scope,name,count rows (scope is total, file
+        or key).
+        """
+        report_file = report_file or self.report_file
+        summary = self.summarize()
+        fields = ("file", "line", "column", "key", "text")
+
+        if report_file.endswith('.csv'):
+            with open(report_file, 'w', encoding='utf-8', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(fields)
+                writer.writerows(self.events)
+            with open(report_file[:-len('.csv')] + '.summary.csv', 'w', encoding='utf-8', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(("scope", "name", "count"))
+                for name in ("files_processed", "files_with_insertions", "insertions"):
+                    writer.writerow(("total", name, summary[name]))
+                writer.writerows(("file", name, count) for name, count in summary["by_file"].items())
+                writer.writerows(("key", name, count) for name, count in summary["by_key"].items())
+        else:
+            with open(report_file, 'w', encoding='utf-8') as f:
+                f.writelines(json.dumps(dict(zip(fields, event))) + '\n' for event in self.events)
+                f.write(json.dumps({"summary": summary}) + '\n')
+
+        return summary
 
     def run(self):
         """Main execution method"""
-        print("Starting glossary command insertion...")
+        self._log("Starting glossary command insertion...")
 
         # Load glossary
         self.load_glossary()
@@ -291,13 +467,36 @@ class GlossaryInserter:
         # Process all files
         self.process_all_files()
 
-        print("\nGlossary insertion complete!")
-        print("\nNext steps:")
-        print("1. Include 'glossary_preamble.tex' in your main LaTeX document preamble")
-        print("2. Add \\makeglossaries after including the preamble file")
-        print("3. Add \\printglossaries where you want the glossary to appear")
-        print("4. Compile with: pdflatex -> makeglossaries -> pdflatex -> pdflatex")
+        # Write the insertion report
+        summary = self.write_report()
+        if not self.quiet:
+            print(f"\nWrote {summary['insertions']} insertion events to {self.report_file}")
+            if self.snapshots.files:
+                print(f"Originals saved as snapshot run {self.snapshots.run_id}; undo with:")
+                print(f"  python scripts/snapshot_store.py restore {self.snapshots.run_id}")
+
+        self._log("\nGlossary insertion complete!")
+        self._log("\nNext steps:")
+        self._log("1. Include 'glossary_preamble.tex' in your main LaTeX document preamble")
+        self._log("2. Add \\makeglossaries after including the preamble file")
+        self._log("3. Add \\printglossaries where you want the glossary to appear")
+        self._log("4. Compile with: pdflatex -> makeglossaries -> pdflatex -> pdflatex")
 
 if __name__ == "__main__":
-    inserter = GlossaryInserter()
+    parser = argparse.ArgumentParser(description="Insert \\gls{} commands into LaTeX chapters")
+    parser.add_argument("--whole-file", action="store_true",
+                        help="Match each file as one buffer so terms can span line wraps")
+    parser.add_argument("--report", default="glossary_insertions.jsonl",
+                        help="Insertion report file (default: glossary_insertions.jsonl). JSONL has one "
+                             "object per insertion (file, line, column, key, text) and a final "
+                             "{\"summary\": ...} object with counts in total, by file and by key. A .csv "
+                             "name writes the insertions as CSV and the counts to <name>.summary.csv "
+                             "as scope,name,count rows")
+    parser.add_argument("--quiet", action="store_true", help="Only print warnings and errors")
+    parser.add_argument("--progress", action="store_true",
+                        help="Show a progress bar instead of per-file output")
+    args = parser.parse_args()
+
+    inserter = GlossaryInserter(whole_file=args.whole_file, quiet=args.quiet,
+                                progress=args.progress, report_file=args.report)
     inserter.run()
@@ -1,106 +1,245 @@
 import os
 import re
+import sys
 import json
+import argparse
 import pathlib
 from collections import defaultdict
 
-# Load configuration
-CONFIG_PATH = "latex_tagger_config.json"
-with open(CONFIG_PATH, "r") as f:
-    config = json.load(f)
-
-LATEX_DIR = pathlib.Path(config["latex_directory"])
-OUTPUT_DIR = pathlib.Path(config["processed_directory"])
-OUTPUT_DIR.mkdir(exist_ok=True)
-
-GLOSSARY_FILE = config["glossary_terms_file"]
-INDEX_FILE = config["index_terms_file"]
-STRUCTURAL_COMMANDS = config["structural_commands"]
-MIN_INDEX_REPEAT_DISTANCE = config["min_index_repeat_distance"]
+# Worker pool shared with the indexing scripts
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "scripts"))
+from file_pool import atomic_open, map_files
+from term_matcher import TermMatcher, fold_case
+
+# Configuration is read in main() (or by load_config), not at import time.
+# Searched in order when --config is not given.
+CONFIG_CANDIDATES = (
+    pathlib.Path("latex_tagger_config.json"),
+    pathlib.Path(__file__).resolve().parent / "latex_tagger.json",
+)
+
+DEFAULT_STRUCTURAL_COMMANDS = [
+    "\\chapter{", "\\section{", "\\subsection{", "\\subsubsection{",
+    "\\paragraph{", "\\subparagraph{", "\\part{", "\\title{",
+]
+DEFAULT_MIN_INDEX_REPEAT_DISTANCE = 150
+
+
+def load_config(config_path=None):
+    if config_path is None:
+        config_path = next((p for p in CONFIG_CANDIDATES if p.exists()), CONFIG_CANDIDATES[0])
+    with open(config_path, "r") as f:
+        return json.load(f)
 
 # Load glossary and index terms
 def load_json_file(filename):
     with open(filename, "r", encoding="utf-8") as f:
         return json.load(f)
 
-glossary_map = load_json_file(GLOSSARY_FILE) if config["glossary_enabled"] else {}
-index_map = load_json_file(INDEX_FILE) if config["index_enabled"] else {}
+def load_index_map(filename):
+    """Return {index entry: [variants]} from index_terms.json.
+
+    Entries look like {"terms": [...], "see also": ..., <subentry>: {...}};
+    subentries become "parent!child" index entries. Plain lists are kept.
+    """
+    index_map = {}
+
+    def collect(entry_key, entry):
+        if isinstance(entry, list):
+            index_map[entry_key] = entry
+            return
+        if entry.get("terms"):
+            index_map[entry_key] = entry["terms"]
+        for sub_key, value in entry.items():
+            if sub_key not in ("terms", "see also") and isinstance(value, (dict, list)):
+                collect(f"{entry_key}!{sub_key}", value)
+
+    for key, entry in load_json_file(filename).items():
+        collect(key, entry)
+    return index_map
+
+
+class VariantTable:
+    """Every variant of a term map compiled into one matcher.
+
+    A matched variant belongs to the first entry that lists it. With
+    match_case a match must also have one of the listed spellings.
+    """
+
+    def __init__(self, variants_by_key, match_case=False):
+        self.matcher = TermMatcher(v for variants in variants_by_key.values() for v in variants)
+        self.match_case = match_case
+        # spellings[pattern id] = {variant as listed: entry key}
+        self.spellings = [{} for _ in self.matcher.patterns]
+        for key, variants in variants_by_key.items():
+            for variant in variants:
+                pid = self.matcher.pattern_ids.get(fold_case(variant))
+                if pid is not None:
+                    self.spellings[pid].setdefault(variant, key)
+        self.keys = [next(iter(spellings.values())) for spellings in self.spellings]
+
+    @classmethod
+    def from_glossary(cls, glossary_map):
+        # \gls{} replaces the text, so only listed spellings are tagged
+        return cls({key: entry["variants"] for key, entry in glossary_map.items()}, match_case=True)
+
+    def key(self, line, start, end, pid):
+        """Entry key of a match, or None if its spelling is not listed"""
+        return self.spellings[pid].get(line[start:end]) if self.match_case else self.keys[pid]
+
+    def find(self, line, accept=None):
+        """Yield (start, end, key) for leftmost-longest variant matches in line.
+
+        A match with an unlisted spelling, or whose key accept(key) rejects,
+        gives way to the next shorter or later match. accept is called as
+        the scan reaches each match, after earlier matches were yielded.
+        """
+        def usable(start, end, pid):
+            key = self.key(line, start, end, pid)
+            return key is not None and (accept is None or accept(key))
+
+        for start, end, pid in self.matcher.iter_longest(line, usable):
+            yield start, end, self.key(line, start, end, pid)
+
+
+class TaggerSettings:
+    """Term maps and options for one run; sent once to each worker process"""
+
+    def __init__(self, config):
+        self.glossary_map = load_json_file(config["glossary_terms_file"]) if config["glossary_enabled"] else {}
+        self.index_map = load_index_map(config["index_terms_file"]) if config["index_enabled"] else {}
+        self.glossary_table = VariantTable.from_glossary(self.glossary_map)
+        self.index_table = VariantTable(self.index_map)
+        self.output_dir = pathlib.Path(config["processed_directory"])
+        self.structural_commands = config.get("structural_commands", DEFAULT_STRUCTURAL_COMMANDS)
+        self.min_index_repeat_distance = config.get("min_index_repeat_distance",
+                                                    DEFAULT_MIN_INDEX_REPEAT_DISTANCE)
 
 # Helper functions
-def is_inside_structural_command(line):
-    return any(line.strip().startswith(cmd) for cmd in STRUCTURAL_COMMANDS)
+def is_inside_structural_command(line, structural_commands=DEFAULT_STRUCTURAL_COMMANDS):
+    return any(line.strip().startswith(cmd) for cmd in structural_commands)
 
 def tokenize_words(text):
     return re.findall(r'\b\w+\b', text)
 
-def insert_gls_and_index(lines, glossary_map, index_map):
-    modified_lines = []
+def insert_gls_and_index(lines, glossary_map, index_map,
+                         structural_commands=DEFAULT_STRUCTURAL_COMMANDS,
+                         min_index_repeat_distance=DEFAULT_MIN_INDEX_REPEAT_DISTANCE):
+    """Yield each line with \\gls{} and \\index{} commands inserted.
+
+    lines may be any iterable, such as an open file, so only the current
+    line is held in memory.
+
+    The maps may be passed raw or as prebuilt VariantTables. Each line is
+    scanned once per table. A glossary key replaces its first match in the
+    line, spelled as listed; an index key is appended after its first match (after the \\gls{}
+    that replaced it, if any) unless the key was indexed fewer than
+    min_index_repeat_distance words earlier.
+    """
+    glossary_table = glossary_map if isinstance(glossary_map, VariantTable) else VariantTable.from_glossary(glossary_map)
+    index_table = index_map if isinstance(index_map, VariantTable) else VariantTable(index_map)
     last_index_positions = defaultdict(lambda: -99999)
     word_count = 0
 
     for line in lines:
-        original_line = line
-        if is_inside_structural_command(line):
-            modified_lines.append(line)
+        if is_inside_structural_command(line, structural_commands):
+            yield line
             continue
 
         tokens = tokenize_words(line)
-        new_line = line
-        for key, entry in glossary_map.items():
-            for variant in entry["variants"]:
-                if re.search(rf'\b{re.escape(variant)}\b', line, re.IGNORECASE):
-                    new_line = re.sub(
-                        rf'\b({re.escape(variant)})\b',
-                        rf'\\gls{{{key}}}',
-                        new_line,
-                        count=1
-                    )
-                    break
-
-        for key, variants in index_map.items():
-            for variant in variants:
-                match = re.search(rf'\b{re.escape(variant)}\b', line, re.IGNORECASE)
-                if match and (word_count - last_index_positions[key] >= MIN_INDEX_REPEAT_DISTANCE):
-                    pos = match.start()
-                    insert_pos = line.find(variant, pos)
-                    new_line = new_line[:insert_pos + len(variant)] + f"\\index{{{key}}}" + new_line[insert_pos + len(variant):]
-                    last_index_positions[key] = word_count
-                    break
+        # (start, end, text): replace line[start:end] with text
+        edits = []
+        glossary_keys = set()
+        for start, end, key in glossary_table.find(line, lambda key: key not in glossary_keys):
+            glossary_keys.add(key)
+            edits.append((start, end, f"\\gls{{{key}}}"))
+        replaced = list(edits)
+
+        index_keys = set()
+        def indexable(key):
+            return key not in index_keys and word_count - last_index_positions[key] >= min_index_repeat_distance
+
+        for start, end, key in index_table.find(line, indexable):
+            index_keys.add(key)
+            end = max([end] + [r_end for r_start, r_end, _ in replaced if r_start < end and start < r_end])
+            edits.append((end, end, f"\\index{{{key}}}"))
+            last_index_positions[key] = word_count
+
+        if edits:
+            pieces = []
+            last = 0
+            for start, end, text in sorted(edits, key=lambda edit: (edit[0], edit[1])):
+                pieces.append(line[last:start])
+                pieces.append(text)
+                last = end
+            pieces.append(line[last:])
+            line = "".join(pieces)
 
         word_count += len(tokens)
-        modified_lines.append(new_line)
-
-    return modified_lines
+        yield line
 
 # Interactive TUI
 def prompt_continue(file):
     resp = input(f"\nProcess file: {file.name}? [y/n]: ").strip().lower()
     return resp == "y"
 
-def process_latex_file(file_path):
-    with open(file_path, "r", encoding="utf-8") as f:
-        lines = f.readlines()
-
-    updated_lines = insert_gls_and_index(lines, glossary_map, index_map)
-
-    output_path = OUTPUT_DIR / file_path.name
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.writelines(updated_lines)
-
-    print(f"✓ Processed and saved: {output_path}")
-
-def main():
-    tex_files = sorted(LATEX_DIR.glob("*.tex"))
+def process_latex_file(file_path, settings=None):
+    if settings is None:
+        settings = TaggerSettings(load_config())
+
+    # Stream line by line into a temporary file renamed over the output
+    output_path = settings.output_dir / file_path.name
+    with open(file_path, "r", encoding="utf-8") as source, atomic_open(str(output_path)) as target:
+        target.writelines(insert_gls_and_index(source, settings.glossary_table, settings.index_table,
+                                               settings.structural_commands, settings.min_index_repeat_distance))
+
+    return output_path
+
+def _process_task(settings, file_path):
+    return process_latex_file(file_path, settings)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Insert \\gls{} and \\index{} commands into LaTeX files")
+    parser.add_argument("--config", type=pathlib.Path,
+                        help="Configuration file (default: latex_tagger_config.json in the current "
+                             "directory, else latex_tagger.json next to this script)")
+    selection = parser.add_mutually_exclusive_group()
+    selection.add_argument("--all", action="store_true",
+                           help="Process every .tex file in the LaTeX directory without prompting")
+    selection.add_argument("--files", metavar="GLOB", action="append",
+                           help="Process files matching GLOB (relative to the LaTeX directory) "
+                                "without prompting; may be repeated")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Number of worker processes (default: all cores)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = load_config(args.config)
+    latex_dir = pathlib.Path(config["latex_directory"])
+    settings = TaggerSettings(config)
+    settings.output_dir.mkdir(exist_ok=True)
+
+    tex_files = sorted(latex_dir.glob("*.tex"))
     print("LaTeX Glossary + Index Tagger")
     print("=============================")
-    print(f"Found {len(tex_files)} LaTeX files in '{LATEX_DIR}'")
+    print(f"Found {len(tex_files)} LaTeX files in '{latex_dir}'")
+
+    if args.all:
+        selected = tex_files
+    elif args.files:
+        selected = sorted({path for pattern in args.files for path in latex_dir.glob(pattern)})
+    else:
+        selected = [file for file in tex_files if prompt_continue(file)]
 
-    for file in tex_files:
-        if prompt_continue(file):
-            process_latex_file(file)
+    for file, output_path, error in map_files(settings, _process_task, selected, args.jobs):
+        if error:
+            print(f"✗ Failed: {file}: {error}")
+        else:
+            print(f"✓ Processed and saved: {output_path}")
 
     print("\n✅ All selected files processed.")
-    print(f"Results saved in: {OUTPUT_DIR}")
+    print(f"Results saved in: {settings.output_dir}")
 
 if __name__ == "__main__":
     main()
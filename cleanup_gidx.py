@@ -37,7 +37,9 @@ Operations Performed (default run):
         independence, text-to-speech) to clean up doubled visible tokens created
        when collapsing tags.
 
-    6. Generates .bak backups for each modified file unless --no-backup is provided.
+    6. Snapshots each modified file into the shared snapshot store (.snapshots/)
+       unless --no-backup is provided; a run is undone with
+           python scripts/snapshot_store.py restore <run-id>
 
 Features:
     - Dry run mode to preview changes.
@@ -83,7 +85,10 @@ import re
 import sys
 from pathlib import Path
 from dataclasses import dataclass, field
-from typing import List, Pattern, Tuple, Dict
+from typing import List, Optional, Pattern, Tuple, Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "scripts"))
+from snapshot_store import SnapshotRun, SnapshotStore
 
 
 # ---------------------------------------------------------------------------
@@ -256,7 +261,7 @@ def visible_word_collapse(text: str, counts: Counts, path: Path) -> str:
     return text
 
 
-def process_file(path: Path, args, counts: Counts):
+def process_file(path: Path, args, counts: Counts, snapshots: Optional[SnapshotRun] = None):
     try:
         original = path.read_text(encoding='utf-8')
     except Exception as e:
@@ -278,10 +283,8 @@ def process_file(path: Path, args, counts: Counts):
         if args.dry_run:
             print(f"[DRY-RUN] Would modify: {path}")
         else:
-            if not args.no_backup:
-                backup = path.with_suffix(path.suffix + ".bak")
-                if not backup.exists():
-                    backup.write_text(original, encoding='utf-8')
+            if snapshots is not None:
+                snapshots.snapshot(path)
             path.write_text(text, encoding='utf-8')
             if args.verbose:
                 print(f"[MODIFIED] {path}")
@@ -331,7 +334,7 @@ def parse_args(argv: List[str]) -> argparse.Namespace:
     ap.add_argument(
         "--no-backup",
         action="store_true",
-        help="Do not create .bak backups (NOT recommended on first run)."
+        help="Do not snapshot modified files (NOT recommended on first run)."
     )
     return ap.parse_args(argv)
 
@@ -364,14 +367,18 @@ def main(argv: List[str]) -> int:
         print(f"[INFO] Found {len(files)} files matching pattern under {root}")
 
     counts = Counts()
+    snapshots = None if args.dry_run or args.no_backup else SnapshotStore().begin("cleanup_gidx")
     for f in files:
-        process_file(f, args, counts)
+        process_file(f, args, counts, snapshots)
 
     print_summary(counts, args.verbose)
     if args.dry_run:
         print("Dry run complete. No files were modified.")
     else:
         print("Cleanup complete.")
+        if snapshots is not None and snapshots.files:
+            print(f"Originals saved as snapshot run {snapshots.run_id} "
+                  f"(restore: python scripts/snapshot_store.py restore {snapshots.run_id})")
     return 0
 
 
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+benchmark_corpus.py
+
+Purpose:
+  Measures how the insertion engines scale on synthetic LaTeX chapters at
+  multiples of the size of Chapters/. Generated chapters mix sections,
+  labels, longtblr tables, inline and display math, comments, lists and
+  formatted text, with vocabulary drawn from index_terms.json and
+  glossary_terms.json.
+
+  Engines:
+    index          LaTeXIndexProcessor.process_file (scripts/process_indexing.py)
+    glossary       GlossaryInserter.process_file (IndexingGlossary/insert_glossary_commands.py)
+    glossary-file  the same with whole_file=True (terms may span line wraps)
+    tagger         latex_tagger.insert_gls_and_index (IndexingGlossary/latex_tagger.py)
+
+  Every engine/scale pair runs in a fresh process, so peak RSS is its own.
+  Reported per run: setup time, wall time, peak RSS, insertions and
+  insertions/sec. Results are written as JSON (with the git commit) and
+  can be compared against an earlier results file.
+
+Usage:
+  python scripts/benchmark_corpus.py
+  python scripts/benchmark_corpus.py --scales 1 10 --engines index glossary
+  python scripts/benchmark_corpus.py --output after.json --compare before.json
+
+  A run whose time, projected from the engine's previous scale, exceeds
+  --budget seconds is skipped and recorded as such.
+"""
+
+import argparse
+import contextlib
+import glob
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, List, Tuple
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SCRIPTS_DIR)
+GLOSSARY_DIR = os.path.join(REPO_DIR, "IndexingGlossary")
+
+FILLER_WORDS = (
+    "the students teachers use a an and of for with in on to support access learning "
+    "classroom device software reading writing tools provide allows each many often "
+    "instruction skills practice daily independent settings materials information "
+    "visual tactile audio output input display settings options features training "
+    "review assessment goals plan team school home work during before after while"
+).split()
+
+
+def load_vocabulary(index_terms_file: str, glossary_file: str) -> List[str]:
+    """Collect term variants from the index and glossary term files."""
+    vocabulary = set()
+
+    def collect(data):
+        if isinstance(data, dict):
+            for term in data.get('terms', []):
+                if term.strip():
+                    vocabulary.add(term)
+            for key, value in data.items():
+                if key not in ('terms', 'see also'):
+                    collect(value)
+
+    with open(index_terms_file, 'r', encoding='utf-8') as f:
+        collect(json.load(f))
+    with open(glossary_file, 'r', encoding='utf-8') as f:
+        for data in json.load(f).values():
+            for variant in data['variants']:
+                variant = variant.split('!')[0].strip()
+                if variant:
+                    vocabulary.add(variant)
+
+    return sorted(vocabulary)
+
+
+class ChapterGenerator:
+    """Deterministic synthetic LaTeX chapters built from a vocabulary."""
+
+    def __init__(self, vocabulary: List[str], seed: int):
+        self.vocabulary = vocabulary
+        self.rng = random.Random(seed)
+
+    def term(self) -> str:
+        return self.rng.choice(self.vocabulary)
+
+    def sentence(self) -> str:
+        words = self.rng.choices(FILLER_WORDS, k=self.rng.randint(8, 20))
+        for _ in range(self.rng.choice((0, 1, 1, 2))):
+            words.insert(self.rng.randrange(len(words) + 1), self.term())
+        roll = self.rng.random()
+        if roll < 0.08:
+            words.append(f"\\textbf{{{self.term()}}}")
+        elif roll < 0.14:
+            words.append(f"(${self.rng.randint(2, 9)}x + {self.rng.randint(1, 99)}$)")
+        elif roll < 0.18:
+            words.append(f"\\href{{https://example.org/{self.rng.randint(1, 999)}}}{{{self.term()}}}")
+        elif roll < 0.22:
+            words.append(f"\\cite{{Ref{self.rng.randint(1, 500)}}}")
+        text = ' '.join(words)
+        return text[0].upper() + text[1:] + '.'
+
+    def paragraph(self) -> str:
+        lines = [self.sentence() for _ in range(self.rng.randint(3, 7))]
+        if self.rng.random() < 0.2:
+            lines.append(f"% TODO: review {self.term()} wording")
+        return '\n'.join(lines)
+
+    def table(self, chapter: int, number: int) -> str:
+        columns = self.rng.randint(3, 5)
+        rows = [' & '.join(self.term() for _ in range(columns)) + ' \\\\']
+        for _ in range(self.rng.randint(3, 8)):
+            cells = [self.term()] + [f"{self.rng.uniform(1, 500):.2f}" for _ in range(columns - 1)]
+            rows.append(' & '.join(cells) + ' \\\\')
+        return '\n'.join([
+            "\\begin{longtblr}[",
+            f"\t\tcaption = {{Comparison of {self.term()} options}},",
+            f"\t\tlabel = {{ch{chapter}:tab:{number}}},",
+            "\t]{",
+            f"\t\tcolspec = {{{' '.join(['X[l]'] * columns)}}},",
+            "\t\trowhead = 1,",
+            "\t}",
+            *('\t' + row for row in rows),
+            "\\end{longtblr}",
+        ])
+
+    def display_math(self) -> str:
+        a, b = self.rng.randint(2, 40), self.rng.randint(2, 40)
+        return f"\\[\n\tE = \\frac{{{a}}}{{{b}}} \\sum_{{i=1}}^{{n}} x_i\n\\]"
+
+    def item_list(self) -> str:
+        items = [f"\t\\item {self.sentence()}" for _ in range(self.rng.randint(2, 5))]
+        return '\n'.join(["\\begin{itemize}", *items, "\\end{itemize}"])
+
+    def chapter(self, number: int, target_bytes: int) -> str:
+        parts = [
+            f"% Synthetic chapter {number}",
+            f"\\chapter{{{self.term().title()} and {self.term().title()}}}\\label{{ch{number}:intro}}",
+            self.paragraph(),
+        ]
+        size = sum(len(p) for p in parts)
+        section = 0
+        while size < target_bytes:
+            section += 1
+            block = [f"\\section{{{self.term().title()}}}\\label{{ch{number}:sec:{section}}}"]
+            for _ in range(self.rng.randint(2, 4)):
+                block.append(self.paragraph())
+            roll = self.rng.random()
+            if roll < 0.35:
+                block.append(self.table(number, section))
+            elif roll < 0.55:
+                block.append(self.display_math())
+            if self.rng.random() < 0.4:
+                block.append(f"\\subsection{{{self.term().title()}}}\\label{{ch{number}:subsec:{section}}}")
+                block.append(self.item_list())
+                block.append(self.paragraph())
+            text = '\n\n'.join(block)
+            parts.append(text)
+            size += len(text)
+        return '\n\n'.join(parts) + '\n'
+
+
+def chapters_size(pattern: str) -> Tuple[int, int]:
+    """Return (total bytes, file count) of the real chapters."""
+    files = glob.glob(pattern)
+    return sum(os.path.getsize(f) for f in files), len(files)
+
+
+def generate_corpus(directory: str, scale: int, vocabulary: List[str],
+                    base_bytes: int, base_files: int, seed: int) -> Tuple[int, int]:
+    """Write scale x base_bytes of synthetic chapters; return (files, bytes)."""
+    os.makedirs(directory, exist_ok=True)
+    generator = ChapterGenerator(vocabulary, seed)
+    per_chapter = max(1, base_bytes // max(1, base_files))
+    target = base_bytes * scale
+    written = 0
+    count = 0
+    while written < target:
+        text = generator.chapter(count, per_chapter)
+        with open(os.path.join(directory, f"Synthetic{count:05d}.tex"), 'w', encoding='utf-8') as f:
+            f.write(text)
+        written += len(text.encode('utf-8'))
+        count += 1
+    return count, written
+
+
+def _count(text: str, *commands: str) -> int:
+    return sum(text.count(command) for command in commands)
+
+
+def run_index(corpus: str, workdir: str, terms: Dict[str, str]):
+    """Engine runners yield once after setup, then yield the insertion count."""
+    from process_indexing import LaTeXIndexProcessor
+
+    processor = LaTeXIndexProcessor(terms['index'])
+    yield
+    insertions = 0
+    for path in sorted(glob.glob(os.path.join(corpus, '*.tex'))):
+        _, stats = processor.process_file(path)
+        insertions += stats['inserted_indexes'] - stats['original_indexes']
+    yield insertions
+
+
+def run_glossary(corpus: str, workdir: str, terms: Dict[str, str], whole_file: bool = False):
+    sys.path.insert(0, GLOSSARY_DIR)
+    from pathlib import Path
+    from insert_glossary_commands import GlossaryInserter
+
+    # GlossaryInserter rewrites files in place, so it works on a copy
+    copy = os.path.join(workdir, 'glossary_corpus')
+    shutil.copytree(corpus, copy)
+    paths = sorted(Path(copy).glob('*.tex'))
+    before = sum(_count(p.read_text(encoding='utf-8'), '\\gls{') for p in paths)
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        inserter = GlossaryInserter(terms['glossary'], chapters_dir=copy, whole_file=whole_file,
+                                    snapshot_dir=os.path.join(workdir, 'snapshots'))
+        inserter.load_glossary()
+        yield
+        for path in paths:
+            inserter.process_file(path)
+
+    after = sum(_count(p.read_text(encoding='utf-8'), '\\gls{') for p in paths)
+    yield after - before
+
+
+def run_tagger(corpus: str, workdir: str, terms: Dict[str, str]):
+    sys.path.insert(0, GLOSSARY_DIR)
+    import latex_tagger
+
+    glossary_table = latex_tagger.VariantTable.from_glossary(latex_tagger.load_json_file(terms['glossary']))
+    index_table = latex_tagger.VariantTable(latex_tagger.load_index_map(terms['index']))
+    yield
+    insertions = 0
+    for path in sorted(glob.glob(os.path.join(corpus, '*.tex'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+        updated = latex_tagger.insert_gls_and_index(lines, glossary_table, index_table)
+        insertions += _count(''.join(updated), '\\gls{', '\\index{') - _count(''.join(lines), '\\gls{', '\\index{')
+    yield insertions
+
+
+ENGINES = {
+    'index': run_index,
+    'glossary': run_glossary,
+    'glossary-file': partial(run_glossary, whole_file=True),
+    'tagger': run_tagger,
+}
+
+
+def measure(engine: str, corpus: str, terms: Dict[str, str]) -> Dict:
+    """Run one engine over a corpus; executed in a fresh worker process."""
+    with tempfile.TemporaryDirectory(prefix=f"bench-{engine}-") as workdir:
+        start = time.perf_counter()
+        steps = ENGINES[engine](corpus, workdir, terms)
+        next(steps)  # Imports and term loading
+        setup_seconds = time.perf_counter() - start
+        setup_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        start = time.perf_counter()
+        insertions = next(steps)
+        wall_seconds = time.perf_counter() - start
+
+    return {
+        'setup_seconds': round(setup_seconds, 4),
+        'wall_seconds': round(wall_seconds, 4),
+        'setup_rss_mb': round(setup_rss / 1024, 1),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'insertions': insertions,
+        'insertions_per_sec': round(insertions / wall_seconds, 1) if wall_seconds else None,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: List[Dict], baseline_file: str) -> None:
+    """Print wall-time ratios against an earlier results file."""
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        baseline = {(r['engine'], r['scale']): r for r in json.load(f)['results']}
+    print(f"\nCompared with {baseline_file}:")
+    for result in results:
+        old = baseline.get((result['engine'], result['scale']))
+        if not old or 'wall_seconds' not in old or 'wall_seconds' not in result:
+            continue
+        ratio = result['wall_seconds'] / old['wall_seconds'] if old['wall_seconds'] else float('inf')
+        print(f"  {result['engine']:13s} {result['scale']:4d}x  {old['wall_seconds']:9.2f}s -> "
+              f"{result['wall_seconds']:9.2f}s  ({ratio:.2f}x)")
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Benchmark insertion engines on synthetic chapters.")
+    ap.add_argument("--scales", type=int, nargs='+', default=[1, 10, 100],
+                    help="Corpus sizes as multiples of Chapters/ (default: 1 10 100).")
+    ap.add_argument("--engines", nargs='+', choices=sorted(ENGINES), default=sorted(ENGINES),
+                    help="Engines to run (default: all).")
+    ap.add_argument("--chapters", default=os.path.join(REPO_DIR, "Chapters", "*.tex"),
+                    help="Glob of real chapters that sets the 1x size.")
+    ap.add_argument("--index-terms", default=os.path.join(GLOSSARY_DIR, "index_terms.json"))
+    ap.add_argument("--glossary-terms", default=os.path.join(GLOSSARY_DIR, "glossary_terms.json"))
+    ap.add_argument("--seed", type=int, default=2023, help="Corpus generator seed (default: 2023).")
+    ap.add_argument("--budget", type=float, default=600,
+                    help="Skip runs projected to take longer than this many seconds (default: 600).")
+    ap.add_argument("--workdir", help="Where to generate corpora (default: a temporary directory).")
+    ap.add_argument("--output", default="benchmark_corpus.json",
+                    help="Results JSON file (default: benchmark_corpus.json).")
+    ap.add_argument("--compare", help="Earlier results JSON to compare wall times against.")
+    return ap.parse_args(argv)
+
+
+def main(argv: List[str]) -> int:
+    args = parse_args(argv)
+    terms = {'index': os.path.abspath(args.index_terms), 'glossary': os.path.abspath(args.glossary_terms)}
+    vocabulary = load_vocabulary(terms['index'], terms['glossary'])
+    base_bytes, base_files = chapters_size(args.chapters)
+    print(f"Base size: {base_bytes} bytes in {base_files} chapters; {len(vocabulary)} vocabulary terms")
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="synthetic-corpus-")
+    results = []
+    last_run = {}  # engine -> (scale, wall seconds)
+    context = multiprocessing.get_context('spawn')
+    try:
+        for scale in sorted(args.scales):
+            corpus = os.path.join(workdir, f"scale{scale}")
+            files, size = generate_corpus(corpus, scale, vocabulary, base_bytes, base_files,
+                                          args.seed + scale)
+            print(f"\n{scale}x corpus: {files} files, {size / 1e6:.1f} MB")
+
+            for engine in args.engines:
+                record = {'engine': engine, 'scale': scale, 'files': files, 'bytes': size}
+                if engine in last_run:
+                    prev_scale, prev_wall = last_run[engine]
+                    projected = prev_wall * scale / prev_scale
+                    if projected > args.budget:
+                        record['skipped'] = f"projected {projected:.0f}s exceeds --budget {args.budget:.0f}s"
+                        print(f"  {engine:13s} skipped ({record['skipped']})")
+                        results.append(record)
+                        continue
+
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    record.update(executor.submit(measure, engine, corpus, terms).result())
+                last_run[engine] = (scale, record['wall_seconds'])
+                results.append(record)
+                print(f"  {engine:13s} {record['wall_seconds']:9.2f}s  peak {record['peak_rss_mb']:7.1f} MB  "
+                      f"{record['insertions']:8d} insertions  {record['insertions_per_sec'] or 0:10.1f}/s")
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'seed': args.seed,
+        'base_bytes': base_bytes,
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+benchmark_indexing.py
+
+Purpose:
+  Compares the per-term regex insertion engine with the single-pass
+  automaton engine in index_engine.py (process_indexing.py / process_indexing_v2.py).
+  Both engines run on the same chapter; the script reports timings and
+  whether the two outputs are byte-identical. It also times the windowed
+  _is_in_structural_command rescans against the per-file structural span map
+  over every candidate match position.
+
+Usage:
+  python scripts/benchmark_indexing.py
+  python scripts/benchmark_indexing.py --file Chapters/Chapter05.tex --repeat 5
+  python scripts/benchmark_indexing.py --terms IndexingGlossary/index_terms.json
+
+Exit Codes:
+  0  Outputs identical for every processor
+  1  At least one processor produced different output
+"""
+
+import argparse
+import sys
+import time
+from typing import Callable, List, Tuple
+
+from process_indexing import LaTeXIndexProcessor
+from process_indexing_v2 import SafeLaTeXIndexProcessor
+
+
+def time_engine(engine: Callable[[str], str], text: str, repeat: int) -> Tuple[float, str]:
+    """Return the best wall time over `repeat` runs and the engine output."""
+    best = float('inf')
+    output = ''
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = engine(text)
+        best = min(best, time.perf_counter() - start)
+    return best, output
+
+
+def compare_structural_checks(processor: LaTeXIndexProcessor, text: str) -> bool:
+    """Time window rescans against span-map lookups; return True if they agree."""
+    positions = [start for start, _, _ in processor.matcher.find_all(text)]
+
+    start = time.perf_counter()
+    window_hits = [processor._is_in_structural_command(text, pos) for pos in positions]
+    window_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    spans = processor._find_structural_spans(text)
+    span_hits = [spans.contains(pos) for pos in positions]
+    span_time = time.perf_counter() - start
+
+    disagreements = sum(1 for a, b in zip(window_hits, span_hits) if a != b)
+    print(f"Structural-command checks ({len(positions)} candidate positions):")
+    print(f"  window rescans:   {window_time * 1000:9.1f} ms")
+    print(f"  span map:         {span_time * 1000:9.1f} ms")
+    print(f"  disagreements:    {disagreements:9d}")
+    return disagreements == 0
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Benchmark index insertion engines.")
+    ap.add_argument("--file", default="Chapters/Chapter00.tex",
+                    help="Chapter to benchmark (default: Chapters/Chapter00.tex).")
+    ap.add_argument("--terms", default="IndexingGlossary/index_terms.json",
+                    help="Normalized index terms JSON file.")
+    ap.add_argument("--repeat", type=int, default=3,
+                    help="Runs per engine; the best time is reported (default: 3).")
+    return ap.parse_args(argv)
+
+
+def main(argv: List[str]) -> int:
+    args = parse_args(argv)
+
+    with open(args.file, 'r', encoding='utf-8') as f:
+        text = f.read()
+
+    print(f"Benchmarking index insertion on {args.file} ({len(text)} chars)")
+    print("=" * 60)
+
+    identical = True
+    for processor_cls in (LaTeXIndexProcessor, SafeLaTeXIndexProcessor):
+        processor = processor_cls(args.terms)
+        per_term_time, per_term_out = time_engine(
+            processor._insert_index_commands_per_term, text, args.repeat)
+        automaton_time, automaton_out = time_engine(
+            processor._insert_index_commands, text, args.repeat)
+        same = per_term_out == automaton_out
+        identical = identical and same
+
+        print(f"{processor_cls.__name__}:")
+        print(f"  per-term regex:   {per_term_time * 1000:9.1f} ms")
+        print(f"  automaton:        {automaton_time * 1000:9.1f} ms")
+        print(f"  speedup:          {per_term_time / automaton_time:9.1f}x")
+        print(f"  identical output: {same}")
+
+    compare_structural_checks(LaTeXIndexProcessor(args.terms), text)
+
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
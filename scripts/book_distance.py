@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Book-wide word-distance model for the LaTeX indexing scripts.
+Reads the chapter order from the \\include{...} list in main.tex and carries
+each term's "words since last kept \\index{}" from one chapter to the next,
+so min_word_distance holds across chapter boundaries. The carry going into
+and out of every chapter is recorded in the manifest as its checkpoint.
+"""
+
+import os
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from file_pool import atomic_write, map_files
+
+INCLUDE_PATTERN = re.compile(r'(?<!\\)%.*$|\\include\s*\{([^}]*)\}', re.MULTILINE)
+
+
+def read_include_order(main_tex: str) -> List[str]:
+    """Return the \\include{} targets of main_tex in order, as .tex paths."""
+    with open(main_tex, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    base = os.path.dirname(main_tex)
+    order = []
+    for match in INCLUDE_PATTERN.finditer(content):
+        target = match.group(1)
+        if not target:
+            continue  # Comment
+        target = target.strip()
+        if not target.endswith('.tex'):
+            target += '.tex'
+        order.append(os.path.normpath(os.path.join(base, target)))
+    return order
+
+
+def order_by_book(file_list: List[str], book_order: List[str]) -> List[str]:
+    """Sort file_list into book order; files main.tex does not include go last."""
+    rank = {path: i for i, path in enumerate(book_order)}
+    return sorted(file_list, key=lambda f: rank.get(os.path.normpath(f), len(rank)))
+
+
+def _prepare(processor, filepath: str) -> Tuple[str, Dict]:
+    return processor.prepare_file(filepath)
+
+
+def process_book(processor, file_list: List[str], book_order: List[str], jobs: int = 1,
+                 manifest=None) -> Iterator[Tuple[str, Optional[Dict], Optional[str], bool]]:
+    """Process file_list with the distance rule applied across book_order.
+
+    Yields (filepath, stats, error, reused) for every file in file_list, in
+    book order with files outside the book last. The per-file insertion step
+    runs in the pool; the cleanup then walks the book in order, carrying
+    state through chapters that are included but not being processed. A
+    file is reused from the manifest only if both its hash and its incoming
+    carry match the previous run.
+    """
+    file_list = order_by_book(file_list, book_order)
+    targets = {os.path.normpath(f): f for f in file_list}
+    in_book = set(book_order)
+
+    # Insertion is independent per file, so prepare every changed file up front
+    changed = [f for f in file_list if manifest is None or manifest.unchanged(f) is None]
+    prepared = {f: (result, error) for f, result, error in map_files(processor, _prepare, changed, jobs)}
+
+    carry: Dict[str, int] = {}
+    for path in book_order:
+        filepath = targets.get(path)
+        if filepath is None:
+            # Included chapter that is not being rewritten: keep its entries
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    _, carry = processor._cleanup_redundant_indexes_carried(f.read(), carry, remove=False)
+            continue
+        carry = yield from _finish(processor, filepath, carry, prepared, manifest)
+
+    # Files outside the include list keep the per-file rule
+    for filepath in file_list:
+        if os.path.normpath(filepath) not in in_book:
+            yield from _finish(processor, filepath, None, prepared, manifest)
+
+
+def _finish(processor, filepath: str, carry: Optional[Dict[str, int]], prepared: Dict,
+            manifest) -> Iterator[Tuple[str, Optional[Dict], Optional[str], bool]]:
+    """Finish one file from carry; yield its outcome and return the outgoing carry."""
+    if manifest is not None:
+        entry = manifest.unchanged(filepath, carry_in=carry)
+        if entry is not None:
+            yield filepath, entry['stats'], None, True
+            return entry.get('carry_out')
+
+    try:
+        if filepath in prepared:
+            result, error = prepared.pop(filepath)
+            if error is not None:
+                raise RuntimeError(error)
+        else:
+            result = processor.prepare_file(filepath)
+        final_content, stats, carry_out = processor._finish_content(*result, carry=carry)
+        atomic_write(filepath, final_content)
+    except Exception as e:
+        yield filepath, None, str(e), False
+        return carry
+
+    if manifest is not None:
+        manifest.record(filepath, stats, carry_in=carry, carry_out=carry_out)
+    yield filepath, stats, None, False
+    return carry_out
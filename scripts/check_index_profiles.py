@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+check_index_profiles.py
+
+Purpose:
+  Regression check for the index engine profiles. Runs process_file for the
+  "basic" and "safe" profiles on every chapter and compares the sha256 of
+  each output with the digests recorded in index_profile_digests.json, so
+  engine refactors can be shown to be byte-identical. It also checks that
+  the single-pass zone lexer builds the same zone map as one re.finditer
+  per forbidden pattern, and that streaming mode already enforces the word
+  distance: the cleanup pass must remove no more entries from streaming
+  output than from the source chapter itself.
+
+  Digests are keyed by the sha256 of each input chapter; a chapter edited
+  since the digests were recorded is reported as stale rather than failed.
+
+Usage:
+  python scripts/check_index_profiles.py
+  python scripts/check_index_profiles.py --profile safe
+  python scripts/check_index_profiles.py --update   # re-record digests
+
+Exit Codes:
+  0  Every checked output matches its digest, the zone maps agree and
+     streaming output needs no extra cleanup
+  1  At least one mismatch
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+from typing import Dict, List
+
+from index_engine import PROFILES, IndexEngine
+from index_manifest import file_sha256
+
+DEFAULT_DIGESTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "index_profile_digests.json")
+
+
+def text_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def check_zone_maps(engine: IndexEngine, files: List[str]) -> int:
+    """Compare lexer and per-pattern zone maps; return the number of differing files."""
+    differing = 0
+    for filepath in files:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            text = f.read()
+        lexer = engine._find_forbidden_regions(text)
+        reference = engine._find_forbidden_regions_per_pattern(text)
+        if (lexer.starts, lexer.ends) != (reference.starts, reference.ends):
+            print(f"  zone map differs: {filepath}")
+            differing += 1
+    return differing
+
+
+def count_removed(engine: IndexEngine, text: str) -> int:
+    """Number of \\index{} entries the cleanup pass would remove from text."""
+    return text.count('\\index{') - engine._cleanup_redundant_indexes(text).count('\\index{')
+
+
+def check_streaming_distance(engine: IndexEngine, files: List[str]) -> int:
+    """Run cleanup on streaming output; return the number of files where it removes new entries."""
+    failing = 0
+    source_removed = stream_removed = 0
+    for filepath in files:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            source, _ = engine._clean_content(f.read())
+        output, _ = engine.process_file(filepath)
+        before, after = count_removed(engine, source), count_removed(engine, output)
+        source_removed += before
+        stream_removed += after
+        if after > before:
+            print(f"  {engine.profile.name} streaming: cleanup removes {after - before} new entries: {filepath}")
+            failing += 1
+    print(f"{engine.profile.name} streaming: cleanup removes {stream_removed} entries "
+          f"({source_removed} already too close in the source)")
+    return failing
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Check index profiles against recorded output digests.")
+    ap.add_argument("--chapters", default="Chapters/*.tex",
+                    help="Glob of chapter files to process (default: Chapters/*.tex).")
+    ap.add_argument("--terms", default="IndexingGlossary/index_terms.json",
+                    help="Normalized index terms JSON file.")
+    ap.add_argument("--digests", default=DEFAULT_DIGESTS,
+                    help="Digest file (default: scripts/index_profile_digests.json).")
+    ap.add_argument("--profile", choices=sorted(PROFILES), action="append",
+                    help="Profile to check (repeatable; default: all).")
+    ap.add_argument("--update", action="store_true",
+                    help="Record the current outputs as the expected digests.")
+    return ap.parse_args(argv)
+
+
+def main(argv: List[str]) -> int:
+    args = parse_args(argv)
+    files = sorted(glob.glob(args.chapters))
+    profiles = args.profile or sorted(PROFILES)
+
+    recorded: Dict = {}
+    if os.path.exists(args.digests):
+        with open(args.digests, 'r', encoding='utf-8') as f:
+            recorded = json.load(f)
+
+    terms_sha = file_sha256(args.terms)
+    if not args.update and recorded.get('index_terms_sha256') not in (None, terms_sha):
+        print(f"Note: {args.terms} changed since the digests were recorded; expect mismatches")
+
+    failures = 0
+    for name in profiles:
+        engine = IndexEngine(args.terms, profile=name)
+        expected = recorded.get('profiles', {}).get(name, {})
+        current = {}
+        matched = stale = 0
+
+        for filepath in files:
+            key = filepath.replace(os.sep, '/')
+            output, _ = engine.process_file(filepath)
+            current[key] = {'input': file_sha256(filepath), 'output': text_sha256(output)}
+
+            entry = expected.get(key)
+            if args.update:
+                continue
+            if entry is None or entry['input'] != current[key]['input']:
+                stale += 1
+            elif entry['output'] != current[key]['output']:
+                print(f"  {name}: output differs: {filepath}")
+                failures += 1
+            else:
+                matched += 1
+
+        if args.update:
+            recorded.setdefault('profiles', {})[name] = current
+            print(f"{name}: recorded {len(current)} digests")
+        else:
+            print(f"{name}: {matched} identical, {stale} stale or unrecorded, "
+                  f"{len(files) - matched - stale} differing")
+
+    engine = IndexEngine(args.terms, profile='safe')
+    zone_differences = check_zone_maps(engine, files)
+    print(f"zone lexer: {len(files) - zone_differences}/{len(files)} files match per-pattern zones")
+    failures += zone_differences
+
+    for name in profiles:
+        failures += check_streaming_distance(IndexEngine(args.terms, profile=name, streaming=True), files)
+
+    if args.update:
+        recorded['index_terms_sha256'] = terms_sha
+        with open(args.digests, 'w', encoding='utf-8') as f:
+            json.dump(recorded, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Digests saved to {args.digests}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
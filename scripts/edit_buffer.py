@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Edit-list buffer for the LaTeX indexing scripts.
+Records (offset, text) insertions against an unmodified original string and
+applies them in one final join instead of re-splicing the text per insertion.
+"""
+
+from typing import Dict, List, Tuple
+
+
+class EditBuffer:
+    """Original text plus the pending insertions, keyed by original offset.
+
+    Offsets passed to insert() refer to the original text. Slicing and len()
+    work in current coordinates, i.e. as if every insertion had already been
+    applied, so existing string checks can read the buffer directly.
+
+    Inserted lengths are kept in a Fenwick tree over the original offsets,
+    so an insertion and every mapping between original and current
+    coordinates take O(log n) time, in whatever order edits arrive.
+    """
+
+    def __init__(self, original: str):
+        self.original = original
+        self._size = len(original) + 1  # One slot per original character, plus the end
+        self._tree: List[int] = [0] * (self._size + 1)  # Fenwick tree of inserted lengths
+        self._top = 1 << (self._size.bit_length() - 1)  # Highest power of two <= _size
+        self._texts: Dict[int, List[str]] = {}  # Original offset -> texts, in applied order
+        self._lengths: Dict[int, int] = {}  # Original offset -> total length inserted there
+        self._total = 0
+
+    @property
+    def edits(self) -> List[Tuple[int, str]]:
+        """Return the recorded (original offset, text) edits in order."""
+        return [(offset, text) for offset in sorted(self._texts) for text in self._texts[offset]]
+
+    def insert(self, offset: int, text: str) -> None:
+        """Insert text before the original character at offset.
+
+        A new insertion goes in front of any earlier one at the same offset,
+        matching result[:end] + text + result[end:] on the current text.
+        """
+        if not text:
+            return
+        self._texts.setdefault(offset, []).insert(0, text)
+        self._lengths[offset] = self._lengths.get(offset, 0) + len(text)
+        self._total += len(text)
+        i = offset + 1
+        while i <= self._size:
+            self._tree[i] += len(text)
+            i += i & -i
+
+    def _inserted_before(self, offset: int) -> int:
+        """Total length inserted at original offsets below offset."""
+        i = min(offset, self._size)
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i &= i - 1
+        return total
+
+    def _next_edit(self, offset: int) -> int:
+        """Smallest original offset >= offset with an insertion (_size if none)."""
+        remaining = self._inserted_before(offset)
+        if remaining == self._total:
+            return self._size
+        # Largest prefix of slots whose inserted length does not exceed remaining
+        index = 0
+        step = self._top
+        while step:
+            node = index + step
+            if node <= self._size and self._tree[node] <= remaining:
+                index = node
+                remaining -= self._tree[node]
+            step >>= 1
+        return index
+
+    def current_offset(self, offset: int, inclusive: bool = True) -> int:
+        """Map an original offset to current coordinates.
+
+        With inclusive=True, insertions made at the offset itself are counted
+        (the position of the original character); otherwise they are not (the
+        position just after the previous original character).
+        """
+        position = offset + self._inserted_before(offset)
+        if inclusive:
+            position += self._lengths.get(offset, 0)
+        return position
+
+    def original_offset(self, position: int) -> int:
+        """Map a current offset back to the original text.
+
+        Positions inside inserted text map to the offset the insertion was
+        made at.
+        """
+        if position >= len(self):
+            return position - self._total
+        # Each slot spans its inserted texts and then its original character;
+        # find the slot whose span contains position
+        index = 0
+        remaining = position
+        step = self._top
+        while step:
+            node = index + step
+            if node <= self._size:
+                width = step + self._tree[node]
+                if width <= remaining:
+                    index = node
+                    remaining -= width
+            step >>= 1
+        return index
+
+    def __len__(self) -> int:
+        return len(self.original) + self._total
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1] if key >= 0 else self[len(self) + key:len(self) + key + 1]
+
+        start, stop, step = key.indices(len(self))
+        if step != 1:
+            raise ValueError("EditBuffer only supports contiguous slices")
+        if stop <= start:
+            return ''
+
+        # Walk from the slot containing start: its inserted texts, then the
+        # original run up to the next insertion, until stop is reached
+        offset = self.original_offset(start)
+        first = pos = self.current_offset(offset, inclusive=False)
+        parts = []
+        while pos < stop:
+            texts = self._texts.get(offset)
+            if texts:
+                parts.extend(texts)
+                pos += self._lengths[offset]
+            run_end = min(self._next_edit(offset + 1), len(self.original), offset + max(0, stop - pos))
+            if run_end <= offset:
+                break
+            parts.append(self.original[offset:run_end])
+            pos += run_end - offset
+            offset = run_end
+
+        return ''.join(parts)[start - first:stop - first]
+
+    def apply(self) -> str:
+        """Return the text with every insertion applied, in one join."""
+        parts = []
+        last = 0
+        for offset in sorted(self._texts):
+            parts.append(self.original[last:offset])
+            parts.extend(self._texts[offset])
+            last = offset
+        parts.append(self.original[last:])
+        return ''.join(parts)
+
+    def __str__(self) -> str:
+        return self.apply()
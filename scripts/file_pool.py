@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Per-file worker pool for the LaTeX indexing scripts.
+Runs a processor's process_file over many chapters, optionally in a process
+pool, and writes each result atomically. Results come back in input order so
+stats merge exactly as in a serial run.
+"""
+
+import os
+import stat
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+# Processor copy owned by each worker process, set once by _init_worker
+_worker_processor = None
+
+
+@contextmanager
+def atomic_open(path: str, binary: bool = False) -> Iterator[IO]:
+    """Open a temporary file beside path; on success rename it over path.
+
+    The file keeps the existing mode of path. If the block raises, path is
+    left untouched and the temporary file is removed.
+    """
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with (os.fdopen(fd, 'wb') if binary else os.fdopen(fd, 'w', encoding='utf-8')) as f:
+            yield f
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_write(path: str, content: Union[str, bytes]) -> None:
+    """Write text (or bytes) to path via a temporary file and rename."""
+    with atomic_open(path, binary=isinstance(content, bytes)) as f:
+        f.write(content)
+
+
+def process_and_write(processor, filepath: str) -> Dict:
+    """Process one file, write it back and return its stats."""
+    new_content, stats = processor.process_file(filepath)
+    atomic_write(filepath, new_content)
+    return stats
+
+
+def _run(processor, task: Callable, filepath: str) -> Tuple[str, Any, Optional[str]]:
+    try:
+        return filepath, task(processor, filepath), None
+    except Exception as e:
+        return filepath, None, str(e)
+
+
+def _init_worker(processor) -> None:
+    global _worker_processor
+    _worker_processor = processor
+
+
+def _worker_run(task: Callable, filepath: str) -> Tuple[str, Any, Optional[str]]:
+    return _run(_worker_processor, task, filepath)
+
+
+def map_files(processor, task: Callable, file_list: List[str],
+              jobs: int = 1) -> Iterator[Tuple[str, Any, Optional[str]]]:
+    """Yield (filepath, task(processor, filepath), error) in file_list order.
+
+    task must be a module-level function so it can be sent to workers. With
+    jobs > 1 the processor is pickled once into each worker, so term tables
+    are loaded once per worker rather than once per file.
+    """
+    if jobs <= 1 or len(file_list) <= 1:
+        for filepath in file_list:
+            yield _run(processor, task, filepath)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(jobs, len(file_list)),
+                             initializer=_init_worker, initargs=(processor,)) as executor:
+        yield from executor.map(partial(_worker_run, task), file_list)
+
+
+def run_files(processor, file_list: List[str], jobs: int = 1,
+              manifest=None) -> Iterator[Tuple[str, Optional[Dict], Optional[str], bool]]:
+    """Process and write each file; yield (filepath, stats, error, reused).
+
+    Files the manifest reports as unchanged are not processed and yield
+    their previous stats with reused=True.
+    """
+    reused = {}
+    if manifest is not None:
+        for filepath in file_list:
+            entry = manifest.unchanged(filepath)
+            if entry is not None:
+                reused[filepath] = entry['stats']
+
+    results = map_files(processor, process_and_write,
+                        [f for f in file_list if f not in reused], jobs)
+    for filepath in file_list:
+        if filepath in reused:
+            yield filepath, reused[filepath], None, True
+            continue
+        _, stats, error = next(results)
+        if error is None and manifest is not None:
+            manifest.record(filepath, stats)
+        yield filepath, stats, error, False
@@ -17,7 +17,7 @@ Features:
 - Optional field ordering heuristic (e.g., author, title, journal, booktitle, year, etc.).
 - Optionally sorts fields according to a preferred order, leaving unspecified fields
   in their original order or sorted alphabetically.
-- In‑place editing with optional backup.
+- In‑place editing with an optional snapshot of the original (see snapshot_store.py).
 - Adjustable indentation and maximum line width (simple wrapping for long non-braced text).
 - Gracefully skips entries it cannot parse (emits them unchanged with a warning comment).
 - Title capitalization normalization (Title Case / sentence / lower / upper) for the 'title' field.
@@ -34,7 +34,7 @@ Example usage:
   # Write to new file (no trailing commas on last field by default)
   python format_bib.py global_bibliography.bib -o global_bibliography_formatted.bib
 
-  # In place with backup
+  # In place, snapshotting the original first (undo: snapshot_store.py restore <run-id>)
   python format_bib.py global_bibliography.bib --in-place --backup
 
   # Sort fields using default preference list
@@ -60,6 +60,8 @@ from pathlib import Path
 import textwrap
 from typing import List, Tuple, Dict, Optional, Callable, Iterable
 
+from snapshot_store import SnapshotStore
+
 Entry = Dict[str, str]
 
 
@@ -103,7 +105,8 @@ def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
     p.add_argument("input", type=Path, help="Input .bib file")
     p.add_argument("-o", "--output", type=Path, help="Output file (default: stdout or input if --in-place)")
     p.add_argument("--in-place", action="store_true", help="Modify the input file in place")
-    p.add_argument("--backup", action="store_true", help="Make a .bak backup when using --in-place")
+    p.add_argument("--backup", action="store_true",
+                   help="Snapshot the original into the snapshot store when using --in-place")
     p.add_argument("--indent", type=int, default=2, help="Indent spaces for fields (default: 2)")
     p.add_argument("--width", type=int, default=120, help="Maximum line width (simple wrapping; default: 120)")
     p.add_argument("--sort-fields", action="store_true", help="Sort fields using preferred order list")
@@ -517,8 +520,9 @@ def main(argv: Optional[List[str]] = None) -> int:
 
     if args.in_place:
         if args.backup:
-            backup_path = args.input.with_suffix(args.input.suffix + ".bak")
-            backup_path.write_text(original, encoding="utf-8")
+            snapshots = SnapshotStore().begin("format_bib")
+            snapshots.snapshot(args.input)
+            print(f"Original saved as snapshot run {snapshots.run_id}", file=sys.stderr)
         args.input.write_text(result, encoding="utf-8")
     else:
         if args.output:
@@ -0,0 +1,1030 @@
+#!/usr/bin/env python3
+"""
+LaTeX Index Engine for Steps 3 and 4
+Inserts \\index{} commands based on normalized terms and removes redundant
+entries. One engine serves both index scripts through policy profiles:
+
+  basic  plain text outside structural commands and labels (process_indexing.py)
+  safe   cleans malformed entries first and avoids a wider set of forbidden
+         zones found by a single compiled lexer (process_indexing_v2.py)
+"""
+
+import argparse
+import json
+import re
+import os
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Dict, List, Pattern, Sequence, Tuple
+from collections import defaultdict
+
+from book_distance import order_by_book, process_book, read_include_order
+from edit_buffer import EditBuffer
+from file_pool import atomic_write, run_files
+from index_manifest import IndexManifest, file_sha256
+from index_positions import IndexPositions
+from interval_index import IntervalIndex
+from term_cache import DEFAULT_CACHE_DIR, clear_cache, load_compiled
+from term_matcher import TermMatcher
+from word_offsets import WordOffsets
+
+# Bump when term mapping or matcher construction changes to invalidate caches
+PROCESSOR_VERSION = "2"
+
+
+@dataclass(frozen=True)
+class IndexProfile:
+    """Policy switches that distinguish the index profiles."""
+    name: str
+    title: str
+    results_file: str
+    manifest_file: str
+    subentry_mappings: bool  # Nested terms map to parent!child unless equal to the parent
+    min_term_length: int  # Shorter term variants are never indexed
+    forbidden_zones: bool  # Zone lexer plus brace walk instead of plain-text regions
+    nearby_prefix: bool  # Any \index{ near the match end blocks it, not only complete ones
+    clean_malformed: bool  # Strip label-embedded and nested entries before inserting
+    strip_commands: bool  # Word distances ignore LaTeX commands
+
+
+PROFILES = {
+    'basic': IndexProfile(
+        name='basic', title="LaTeX Index Processing (Steps 3 & 4)",
+        results_file='indexing_results.json', manifest_file='indexing_manifest.json',
+        subentry_mappings=False, min_term_length=0, forbidden_zones=False,
+        nearby_prefix=False, clean_malformed=False, strip_commands=False),
+    'safe': IndexProfile(
+        name='safe', title="Safe LaTeX Index Processing v2 (Steps 3 & 4)",
+        results_file='indexing_results_v2.json', manifest_file='indexing_manifest_v2.json',
+        subentry_mappings=True, min_term_length=3, forbidden_zones=True,
+        nearby_prefix=True, clean_malformed=True, strip_commands=True),
+}
+
+
+class IndexEngine:
+    def __init__(self, index_terms_file: str, profile: str = 'basic', streaming: bool = False,
+                 nearby_chars: int = 50, nearby_words: int = 0, cache_dir: str = None):
+        """Initialize with the normalized index terms JSON file and a profile name.
+
+        With streaming=True, process_file() inserts in text order and enforces
+        min_word_distance as it goes instead of inserting then cleaning up.
+        A match is skipped when an \\index{} lies within nearby_chars characters
+        of it, or within nearby_words words when that is set.
+        Compiled term tables are cached under cache_dir when it is given.
+        """
+        self.profile = PROFILES[profile]
+        compiled, self.loaded_from_cache = load_compiled(
+            index_terms_file, f"IndexEngine-{self.profile.name}", PROCESSOR_VERSION,
+            self._compile_terms, cache_dir)
+        self.index_terms = compiled['index_terms']
+        self.term_mappings = compiled['term_mappings']
+        self.sorted_terms = compiled['sorted_terms']
+        self.matcher = compiled['matcher']
+        self.pattern_canonicals = compiled['pattern_canonicals']
+        # Structural commands where \index{} should NOT be inserted
+        self.structural_commands = {
+            'part', 'chapter', 'section', 'subsection', 'subsubsection',
+            'paragraph', 'subparagraph', 'title', 'author', 'date'
+        }
+        self.structural_pattern = re.compile(
+            r'\\(' + '|'.join(sorted(self.structural_commands | {'label'})) + r')\s*\{')
+        self.brace_pattern = re.compile(r'[{}]')
+        # Per-file counters for the structural-command span map
+        self.structural_timing = {'checks': 0, 'seconds': 0.0}
+        self.min_word_distance = 150  # Minimum words between same index terms
+        self.streaming = streaming
+        self.nearby_chars = nearby_chars
+        self.nearby_words = nearby_words
+
+        # Zones where index commands should NOT be placed (safe profile)
+        self.forbidden_patterns = [
+            ('chapter', r'\\chapter\s*\{[^}]*\}'),
+            ('section', r'\\section\s*\{[^}]*\}'),
+            ('subsection', r'\\subsection\s*\{[^}]*\}'),
+            ('subsubsection', r'\\subsubsection\s*\{[^}]*\}'),
+            ('paragraph', r'\\paragraph\s*\{[^}]*\}'),
+            ('subparagraph', r'\\subparagraph\s*\{[^}]*\}'),
+            ('part', r'\\part\s*\{[^}]*\}'),
+            ('title', r'\\title\s*\{[^}]*\}'),
+            ('author', r'\\author\s*\{[^}]*\}'),
+            ('label', r'\\label\s*\{[^}]*\}'),
+            ('ref', r'\\ref\s*\{[^}]*\}'),
+            ('cite', r'\\cite[a-z]*\s*\{[^}]*\}'),
+            ('hypertarget', r'\\hypertarget\s*\{[^}]*\}'),
+            ('href', r'\\href\s*\{[^}]*\}'),
+            ('url', r'\\url\s*\{[^}]*\}'),
+            ('textbf', r'\\textbf\s*\{[^}]*\}'),
+            ('textit', r'\\textit\s*\{[^}]*\}'),
+            ('emph', r'\\emph\s*\{[^}]*\}'),
+            ('begin', r'\\begin\s*\{[^}]*\}'),
+            ('end', r'\\end\s*\{[^}]*\}'),
+            ('inline_math', r'\$[^$]*\$'),  # Inline math
+            ('display_math', r'\$\$[^$]*\$\$'),  # Display math
+            ('bracket_math', r'\\[.*?\\]'),  # Display math
+            ('comment', r'%.*$'),  # Comments
+        ]
+        self.zone_lexer = self._compile_zone_lexer(self.forbidden_patterns)
+
+    def _compile_terms(self, source: bytes) -> Dict:
+        """Parse index_terms.json and build the mapping and matcher tables."""
+        self.index_terms = json.loads(source.decode('utf-8'))
+        term_mappings = self._build_term_mappings()
+        # Sort terms by length (longest first) to avoid partial matches
+        sorted_terms = sorted(term_mappings.keys(), key=len, reverse=True)
+        matcher = TermMatcher(sorted_terms)
+        # Canonical form per matcher pattern (first term in priority order wins)
+        pattern_canonicals = {}
+        for term in sorted_terms:
+            pattern_canonicals.setdefault(matcher.pattern_id(term), term_mappings[term])
+        return {
+            'index_terms': self.index_terms,
+            'term_mappings': term_mappings,
+            'sorted_terms': sorted_terms,
+            'matcher': matcher,
+            'pattern_canonicals': pattern_canonicals,
+        }
+
+    def _build_term_mappings(self) -> Dict[str, str]:
+        """Build a mapping from all term variants to their canonical forms."""
+        if self.profile.subentry_mappings:
+            return self._build_subentry_mappings()
+
+        mappings = {}
+
+        def extract_terms(data, canonical_key=""):
+            """Recursively extract terms from nested structure."""
+            if isinstance(data, dict):
+                if 'terms' in data:
+                    # Use the first term as canonical form
+                    terms_list = data['terms']
+                    if terms_list:
+                        canon_form = terms_list[0]
+                        if canonical_key:
+                            # For nested terms, use parent!child format
+                            canon_form = f"{canonical_key}!{canon_form}"
+
+                        # Map all variants to canonical form
+                        for term in terms_list:
+                            # Case-insensitive mapping
+                            mappings[term.lower()] = canon_form
+                            mappings[term] = canon_form
+
+                # Process nested entries
+                for key, value in data.items():
+                    if key != 'terms' and key != 'see also':
+                        parent_key = canonical_key if canonical_key else key
+                        if isinstance(value, dict):
+                            if 'terms' in value:
+                                # This is a sub-entry
+                                extract_terms(value, parent_key)
+                            else:
+                                # This might be another level of nesting
+                                extract_terms(value, f"{parent_key}!{key}" if parent_key != key else key)
+
+        for main_key, data in self.index_terms.items():
+            extract_terms(data, main_key)
+
+        return mappings
+
+    def _build_subentry_mappings(self) -> Dict[str, str]:
+        """Build term mappings where nested terms become parent!child subentries."""
+        mappings = {}
+
+        def extract_terms(data, parent_key=""):
+            """Recursively extract terms from nested structure."""
+            if isinstance(data, dict):
+                if 'terms' in data and data['terms']:
+                    # Use the first term as canonical form
+                    canon_form = data['terms'][0]
+
+                    # For nested terms, create subentry format
+                    if parent_key and canon_form.lower() != parent_key.lower():
+                        canon_form = f"{parent_key}!{canon_form}"
+
+                    # Map all variants to canonical form
+                    for term in data['terms']:
+                        if term.strip():  # Only non-empty terms
+                            mappings[term.lower()] = canon_form
+                            mappings[term] = canon_form
+
+                # Process nested entries
+                for key, value in data.items():
+                    if key not in ['terms', 'see also'] and isinstance(value, dict):
+                        new_parent = parent_key if parent_key else key
+                        extract_terms(value, new_parent)
+
+        for main_key, data in self.index_terms.items():
+            extract_terms(data, main_key)
+
+        return mappings
+
+    @staticmethod
+    def _compile_zone_lexer(patterns: Sequence[Tuple[str, str]]) -> Pattern:
+        """Combine the forbidden-zone patterns into one named-group alternation.
+
+        The alternation sits in a lookahead, so the lexer is tried at every
+        backslash, dollar and percent sign and each zone type can resume after
+        its own previous match, exactly like a separate re.finditer per
+        pattern. Command zones start with distinct names and never share a
+        start; display math can share one with inline math, so it is captured
+        by an optional lookahead in front of it.
+        """
+        pattern_map = dict(patterns)
+        alternatives = []
+        for name, pattern in patterns:
+            if name == 'display_math':
+                continue
+            if name == 'inline_math':
+                alternatives.append(f"(?=(?P<display_math>{pattern_map['display_math']}))?"
+                                    f"(?P<inline_math>{pattern})")
+            else:
+                alternatives.append(f"(?P<{name}>{pattern})")
+        return re.compile(r'(?=[\\$%])(?=' + '|'.join(alternatives) + ')', re.MULTILINE)
+
+    def _find_forbidden_regions(self, text: str, edits: EditBuffer = None) -> IntervalIndex:
+        """Find all regions where index commands should not be inserted.
+
+        One pass of the zone lexer builds the zone map. Overlapping regions
+        are merged into a sorted interval index. Pass the EditBuffer that
+        insertions go into to query it in current coordinates.
+        """
+        forbidden_regions = []
+        resume = {}  # Each zone type continues after its own last match
+
+        for match in self.zone_lexer.finditer(text):
+            start = match.start()
+            for name in (match.lastgroup, 'display_math'):
+                end = match.end(name)
+                if end != -1 and start >= resume.get(name, 0):
+                    forbidden_regions.append((start, end))
+                    resume[name] = end
+
+        return IntervalIndex(forbidden_regions, closed=True, edits=edits)
+
+    def _find_forbidden_regions_per_pattern(self, text: str, edits: EditBuffer = None) -> IntervalIndex:
+        """Reference zone map: one re.finditer per pattern (kept for checking)."""
+        forbidden_regions = []
+
+        for _, pattern in self.forbidden_patterns:
+            for match in re.finditer(pattern, text, re.MULTILINE):
+                forbidden_regions.append((match.start(), match.end()))
+
+        return IntervalIndex(forbidden_regions, closed=True, edits=edits)
+
+    def _is_safe_position(self, text: str, position: int, forbidden_regions: IntervalIndex) -> bool:
+        """Check if position is safe for index insertion."""
+        # Check against forbidden regions
+        if forbidden_regions.contains(position):
+            return False
+
+        # Additional safety checks
+        # Check if we're inside braces of any command
+        before_pos = max(0, position - 100)
+        after_pos = min(len(text), position + 100)
+        context = text[before_pos:after_pos]
+        rel_pos = position - before_pos
+
+        # Look for unmatched opening braces before position
+        brace_count = 0
+
+        for i in range(rel_pos - 1, -1, -1):
+            if context[i] == '}':
+                brace_count += 1
+            elif context[i] == '{':
+                brace_count -= 1
+                if brace_count < 0:
+                    # We have an unmatched opening brace
+                    # Check if there's a backslash before it (LaTeX command)
+                    for j in range(i - 1, max(0, i - 20), -1):
+                        if context[j] == '\\' and context[j+1:i].replace(' ', '').replace('\n', '').replace('\t', '').isalpha():
+                            return False
+                        elif not context[j].isspace():
+                            break
+                    break
+
+        return True
+
+    def _word_offsets(self, text: str) -> WordOffsets:
+        """Build the word offset table used for distance checks."""
+        if self.profile.strip_commands:
+            # Remove LaTeX commands and count words
+            return WordOffsets(text,
+                               strip_patterns=(re.compile(r'\\[a-zA-Z]+\s*\{[^}]*\}'),
+                                               re.compile(r'\\[a-zA-Z]+')),
+                               skip_prefix='\\')
+        # Simple word count - words are runs of non-whitespace
+        return WordOffsets(text)
+
+    def _is_in_structural_command(self, text: str, position: int) -> bool:
+        """Check if position is within a structural LaTeX command or label."""
+        # Look backwards from position to find context
+        search_start = max(0, position - 1000)
+        segment = text[search_start:position + 200]
+        relative_pos = position - search_start
+
+        # Check if in a label
+        label_pattern = r'\\label\s*\{[^}]*'
+        for match in re.finditer(label_pattern, segment):
+            if match.start() <= relative_pos <= match.end():
+                return True
+
+        # Check if in any LaTeX command argument
+        cmd_pattern = r'\\[a-zA-Z]+\s*\{[^}]*'
+        for match in re.finditer(cmd_pattern, segment):
+            if match.start() <= relative_pos <= match.end():
+                # Get the command name
+                cmd_match = re.match(r'\\([a-zA-Z]+)', match.group())
+                if cmd_match and cmd_match.group(1) in self.structural_commands:
+                    return True
+
+        # Check if inside any braced argument of structural commands
+        struct_pattern = r'\\(' + '|'.join(self.structural_commands) + r')\s*\{'
+        matches = list(re.finditer(struct_pattern, segment))
+
+        for match in matches:
+            cmd_start = match.start()
+            brace_start = match.end() - 1  # Position of opening brace
+
+            # Find matching closing brace
+            brace_count = 0
+            for i, char in enumerate(segment[brace_start:]):
+                if char == '{':
+                    brace_count += 1
+                elif char == '}':
+                    brace_count -= 1
+                    if brace_count == 0:
+                        cmd_end = brace_start + i
+                        if cmd_start <= relative_pos <= cmd_end:
+                            return True
+                        break
+        return False
+
+    def _find_structural_spans(self, text: str, edits: EditBuffer = None) -> IntervalIndex:
+        """Record every structural command and label argument span in one pass.
+
+        Spans run from the backslash to the matching closing brace, following
+        nested braces. An unclosed argument ends at the next closing brace.
+        """
+        spans = []
+        for match in self.structural_pattern.finditer(text):
+            brace_start = match.end() - 1
+            depth = 0
+            end = None
+            for brace in self.brace_pattern.finditer(text, brace_start):
+                depth += 1 if brace.group() == '{' else -1
+                if depth == 0:
+                    end = brace.start()
+                    break
+            if end is None:
+                end = text.find('}', brace_start)
+                end = len(text) if end == -1 else end
+            spans.append((match.start(), end))
+
+        return IntervalIndex(spans, closed=True, edits=edits)
+
+    def _insert_index_commands(self, text: str) -> str:
+        """Insert \\index{} commands based on term mappings."""
+        return self._collect_index_edits(text).apply()
+
+    def _prepare_regions(self, text: str, result: EditBuffer) -> Tuple:
+        """Build the per-file lookup tables used to accept candidates.
+
+        Returns (zones, structural_spans, index_positions, words). zones are
+        the forbidden regions (safe) or plain text regions (basic), and
+        structural_spans is only built for the basic profile; words is only
+        built when the nearby-index window is measured in words.
+        """
+        self.structural_timing = {'checks': 0, 'seconds': 0.0}
+        if self.profile.forbidden_zones:
+            zones = self._find_forbidden_regions(text, result)
+            structural_spans = None
+        else:
+            # Find plain text regions (not inside LaTeX commands, comments, or math)
+            zones = self._find_plain_text_regions(text, result)
+
+            # Structural command and label spans, built once per file
+            timing_start = time.perf_counter()
+            structural_spans = self._find_structural_spans(text, result)
+            self.structural_timing['seconds'] = time.perf_counter() - timing_start
+
+        # Existing \\index{} commands; insertions are added as they happen
+        index_positions = IndexPositions(text, result)
+        words = self._word_offsets(text) if self.nearby_words else None
+
+        return zones, structural_spans, index_positions, words
+
+    def _nearby_window(self, result: EditBuffer, orig_start: int, orig_end: int,
+                       words: WordOffsets) -> Tuple[int, int]:
+        """Current-coordinate window searched for an existing index command."""
+        if self.profile.nearby_prefix:
+            # Safe profile: the window is centred on the end of the match
+            if self.nearby_words:
+                lo, hi = words.window_around(orig_end, orig_end, self.nearby_words)
+                return result.current_offset(lo), result.current_offset(hi)
+            end_pos = result.current_offset(orig_end, inclusive=False)
+            return max(0, end_pos - self.nearby_chars), min(len(result), end_pos + self.nearby_chars)
+
+        if self.nearby_words:
+            lo, hi = words.window_around(orig_start, orig_end, self.nearby_words)
+            return result.current_offset(lo), result.current_offset(hi)
+        pos = result.current_offset(orig_start)
+        return max(0, pos - self.nearby_chars), pos + (orig_end - orig_start) + self.nearby_chars
+
+    def _accepts_candidate(self, result: EditBuffer, orig_start: int, orig_end: int,
+                           regions: Tuple) -> bool:
+        """Check whether a match (original offsets) may receive an \\index{}."""
+        zones, structural_spans, index_positions, words = regions
+        pos = result.current_offset(orig_start, inclusive=True)
+
+        if self.profile.forbidden_zones:
+            # Check if position is safe
+            if not self._is_safe_position(result, pos, zones):
+                return False
+        else:
+            # Check if match is in a plain text region
+            if not zones.contains(pos):
+                return False
+
+            # Skip if in structural command (additional check)
+            timing_start = time.perf_counter()
+            in_structural = structural_spans.contains(pos)
+            self.structural_timing['seconds'] += time.perf_counter() - timing_start
+            self.structural_timing['checks'] += 1
+            if in_structural:
+                return False
+
+        # Skip if already has an index command nearby
+        lo, hi = self._nearby_window(result, orig_start, orig_end, words)
+        if self.profile.nearby_prefix:
+            return not index_positions.any_prefix_within(lo, hi)
+        return not index_positions.any_within(lo, hi)
+
+    def _emit_index(self, result: EditBuffer, orig_end: int, canonical: str,
+                    regions: Tuple) -> None:
+        """Insert an \\index{} after a match and record its position."""
+        index_cmd = f"\\index{{{canonical}}}"
+        result.insert(orig_end, index_cmd)
+        regions[2].add(orig_end, index_cmd)
+
+    def _collect_index_edits(self, text: str) -> EditBuffer:
+        """Record \\index{} insertions as edits against the original text."""
+        result = EditBuffer(text)
+        regions = self._prepare_regions(text, result)
+
+        # One automaton scan of the original text finds every term occurrence
+        occurrences = self.matcher.find_by_pattern(text)
+
+        # Terms are visited longest first, matches in reverse, as before
+        for term in self.sorted_terms:
+            if len(term.strip()) < self.profile.min_term_length:  # Skip very short terms
+                continue
+
+            canonical = self.term_mappings[term]
+            spans = occurrences.get(self.matcher.pattern_id(term), [])
+
+            for orig_start, orig_end in reversed(spans):
+                pos = result.current_offset(orig_start, inclusive=True)
+                end_pos = result.current_offset(orig_end, inclusive=False)
+
+                # An earlier insertion inside the span means it no longer matches
+                if result[pos:end_pos] != text[orig_start:orig_end]:
+                    continue
+
+                if not self._accepts_candidate(result, orig_start, orig_end, regions):
+                    continue
+
+                # Insert index command after the term
+                self._emit_index(result, orig_end, canonical, regions)
+
+        return result
+
+    def _stream_index_edits(self, text: str) -> Tuple[EditBuffer, Dict[str, int]]:
+        """Insert \\index{} commands in text order, enforcing min_word_distance.
+
+        A candidate is skipped when the nearest entry of its canonical term
+        on either side (an existing entry, or one emitted earlier) is fewer
+        than min_word_distance words away, so no cleanup pass is needed.
+        Distances are measured between entry starts, as the cleanup pass
+        does; a new entry starts at the end of its match. Existing entries
+        are kept. Returns the edit buffer and the counts used for stats.
+        """
+        result = EditBuffer(text)
+        regions = self._prepare_regions(text, result)
+        words = regions[3] or self._word_offsets(text)
+
+        # Starts of the existing entries of each term, in text order
+        existing = defaultdict(list)
+        for match in re.finditer(r'\\index\{([^}]*)\}', text):
+            existing[match.group(1)].append(match.start())
+        last_emitted = {}
+        skipped = 0
+
+        # Leftmost-longest matches, in text order
+        for orig_start, orig_end, pid in self.matcher.find_longest(text):
+            if len(self.matcher.patterns[pid].strip()) < self.profile.min_term_length:
+                continue
+
+            if not self._accepts_candidate(result, orig_start, orig_end, regions):
+                continue
+
+            canonical = self.pattern_canonicals[pid]
+            starts = existing.get(canonical, [])
+            idx = bisect_left(starts, orig_end)
+            previous = max(starts[idx - 1] if idx else -1, last_emitted.get(canonical, -1))
+            if ((previous >= 0 and words.count_between(previous, orig_end) < self.min_word_distance)
+                    or (idx < len(starts)
+                        and words.count_between(orig_end, starts[idx]) < self.min_word_distance)):
+                skipped += 1
+                continue
+
+            self._emit_index(result, orig_end, canonical, regions)
+            last_emitted[canonical] = orig_end
+
+        counts = {'existing': sum(len(starts) for starts in existing.values()), 'skipped': skipped}
+        return result, counts
+
+    def _insert_index_commands_per_term(self, text: str) -> str:
+        """Reference engine: one regex scan per term (kept for benchmarking)."""
+        result = EditBuffer(text)
+
+        # Zones are built once against the original text
+        if self.profile.forbidden_zones:
+            zones = self._find_forbidden_regions_per_pattern(text, result)
+        else:
+            zones = self._find_plain_text_regions(text, result)
+
+        # Sort terms by length (longest first) to avoid partial matches
+        sorted_terms = sorted(self.term_mappings.keys(), key=len, reverse=True)
+
+        for term in sorted_terms:
+            if len(term.strip()) < self.profile.min_term_length:  # Skip very short terms
+                continue
+
+            canonical = self.term_mappings[term]
+
+            # Create regex pattern for the term (word boundaries)
+            pattern = r'\b' + re.escape(term) + r'\b'
+
+            matches = list(re.finditer(pattern, result.apply(), re.IGNORECASE))
+
+            for match in reversed(matches):  # Process in reverse to maintain positions
+                pos = match.start()
+                end_pos = match.end()
+
+                if self.profile.forbidden_zones:
+                    # Check if position is safe
+                    if not self._is_safe_position(result, pos, zones):
+                        continue
+
+                    # Check if there's already an index command nearby
+                    nearby_text = result[max(0, end_pos - 50):min(len(result), end_pos + 50)]
+                    if '\\index{' in nearby_text:
+                        continue
+                else:
+                    # Check if match is in a plain text region
+                    if not zones.contains(pos):
+                        continue
+
+                    # Skip if in structural command (additional check)
+                    if self._is_in_structural_command(result, pos):
+                        continue
+
+                    # Skip if already has an index command nearby
+                    if re.search(r'\\index\{[^}]*\}', result[max(0, pos-50):pos+len(term)+50]):
+                        continue
+
+                # Insert index command after the term
+                index_cmd = f"\\index{{{canonical}}}"
+                result.insert(result.original_offset(end_pos), index_cmd)
+
+        return result.apply()
+
+    def _find_plain_text_regions(self, text: str, edits: EditBuffer = None) -> IntervalIndex:
+        """Find regions of plain text where index commands can be safely inserted.
+
+        Pass the EditBuffer that insertions go into to query the index in
+        current coordinates.
+        """
+        regions = []
+        i = 0
+        while i < len(text):
+            # Skip LaTeX commands
+            if text[i] == '\\':
+                # Find end of command
+                i += 1
+                while i < len(text) and text[i].isalpha():
+                    i += 1
+                # Skip any following whitespace and braced arguments
+                while i < len(text) and text[i].isspace():
+                    i += 1
+                if i < len(text) and text[i] == '{':
+                    brace_count = 1
+                    i += 1
+                    while i < len(text) and brace_count > 0:
+                        if text[i] == '{':
+                            brace_count += 1
+                        elif text[i] == '}':
+                            brace_count -= 1
+                        i += 1
+                continue
+
+            # Skip comments
+            if text[i] == '%':
+                while i < len(text) and text[i] != '\n':
+                    i += 1
+                continue
+
+            # Skip math environments
+            if i < len(text) - 1 and text[i:i+2] in ['$$', '\\[']:
+                delimiter = '$$' if text[i:i+2] == '$$' else '\\]'
+                i += 2
+                while i < len(text) - len(delimiter) + 1:
+                    if text[i:i+len(delimiter)] == delimiter:
+                        i += len(delimiter)
+                        break
+                    i += 1
+                continue
+
+            if text[i] == '$':
+                i += 1
+                while i < len(text) and text[i] != '$':
+                    i += 1
+                if i < len(text):
+                    i += 1
+                continue
+
+            # This is plain text - find the end
+            start = i
+            while i < len(text) and text[i] not in ['\\', '%', '$']:
+                # Check for math environment start
+                if i < len(text) - 1 and text[i:i+2] == '\\[':
+                    break
+                if i < len(text) - 1 and text[i:i+2] == '$$':
+                    break
+                i += 1
+
+            if i > start:
+                regions.append((start, i))
+
+        return IntervalIndex(regions, edits=edits)
+
+    def _cleanup_redundant_indexes(self, text: str) -> str:
+        """Remove redundant \\index{} commands that are too close together."""
+        return self._cleanup_redundant_indexes_carried(text, {})[0]
+
+    def _cleanup_redundant_indexes_carried(self, text: str, carry: Dict[str, int],
+                                           remove: bool = True) -> Tuple[str, Dict[str, int]]:
+        """Remove redundant \\index{} commands, continuing from earlier files.
+
+        carry maps a term to the number of words since its last kept entry in
+        the files before this one; the returned carry does the same at the end
+        of this text. Terms at least min_word_distance words back are dropped
+        from it. With remove=False every entry is kept and only the carry is
+        advanced, for files that are part of the book but not being rewritten.
+        """
+        # Find all index commands
+        index_pattern = r'\\index\{([^}]*)\}'
+        matches = list(re.finditer(index_pattern, text))
+
+        # Word offsets are built once; each distance is then a bisect lookup
+        words = self._word_offsets(text)
+        total_words = len(words)
+
+        # Group by term (matches arrive in position order)
+        term_positions = defaultdict(list)
+        for match in matches:
+            term_positions[match.group(1)].append(match)
+
+        # Find indexes to remove
+        to_remove = []
+        carry_out = {}
+        for term, positions in term_positions.items():
+            # The most recently kept occurrence is always the nearest, so each
+            # occurrence only needs checking against it (or the carried one)
+            last_kept = None
+            carried = carry.get(term)
+
+            for match in positions:
+                if last_kept is not None:
+                    word_distance = words.count_between(last_kept, match.start())
+                elif carried is not None:
+                    word_distance = carried + words.count_between(0, match.start())
+                else:
+                    word_distance = self.min_word_distance
+                if remove and word_distance < self.min_word_distance:
+                    to_remove.append(match)
+                else:
+                    last_kept = match.start()
+
+            if last_kept is not None:
+                tail = words.count_between(last_kept, len(text))
+            else:
+                tail = carried + total_words
+            if tail < self.min_word_distance:
+                carry_out[term] = tail
+
+        # Terms not indexed here just move further back
+        for term, carried in carry.items():
+            if term not in term_positions and carried + total_words < self.min_word_distance:
+                carry_out[term] = carried + total_words
+
+        # Remove redundant indexes in a single join
+        to_remove.sort(key=lambda m: m.start())
+        parts = []
+        last = 0
+        for match in to_remove:
+            parts.append(text[last:match.start()])
+            last = match.end()
+        parts.append(text[last:])
+
+        return ''.join(parts), carry_out
+
+    def _remove_existing_malformed_indexes(self, text: str) -> str:
+        """Remove existing malformed index commands."""
+        # Remove index commands that appear in labels or other problematic places
+        patterns_to_clean = [
+            r'\\label\{[^}]*\\index\{[^}]*\}[^}]*\}',
+            r'\\index\{[^}]*\\index\{[^}]*\}[^}]*\}',  # Nested indexes
+            r'\\index\{[^}]*![^}]*![^}]*\}',  # Triple-nested indexes
+        ]
+
+        result = text
+        for pattern in patterns_to_clean:
+            # For labels, remove just the index part
+            if 'label' in pattern:
+                def replace_label(match):
+                    label_content = match.group(0)
+                    # Remove index commands from within label
+                    cleaned = re.sub(r'\\index\{[^}]*\}', '', label_content)
+                    return cleaned
+                result = re.sub(pattern, replace_label, result)
+            else:
+                # For other malformed indexes, try to fix them
+                result = re.sub(pattern, '', result)
+
+        return result
+
+    def _build_stats(self, counts: Dict, inserted_indexes: int, final_indexes: int) -> Dict:
+        """Assemble per-file stats in the profile's key order."""
+        original_indexes = counts['original_indexes']
+        stats = {'original_indexes': original_indexes}
+        if self.profile.clean_malformed:
+            stats['cleaned_indexes'] = counts['cleaned_indexes']
+        stats['inserted_indexes'] = inserted_indexes
+        stats['final_indexes'] = final_indexes
+        stats['net_added'] = final_indexes - original_indexes
+        if self.profile.clean_malformed:
+            stats['removed_malformed'] = original_indexes - counts['cleaned_indexes']
+        stats['removed_redundant'] = inserted_indexes - final_indexes
+        if not self.profile.forbidden_zones:
+            # Wall-clock figures for this run only: printed, never saved
+            stats['diagnostics'] = {'structural_checks': counts['structural_checks'],
+                                    'structural_check_ms': counts['structural_check_ms']}
+        return stats
+
+    def process_file(self, filepath: str) -> Tuple[str, Dict]:
+        """Process a single LaTeX file."""
+        with open(filepath, 'r', encoding='utf-8') as f:
+            original_content = f.read()
+
+        if self.streaming:
+            return self._process_content_streaming(original_content)
+
+        content_with_indexes, counts = self._prepare_content(original_content)
+        final_content, stats, _ = self._finish_content(content_with_indexes, counts)
+        return final_content, stats
+
+    def prepare_file(self, filepath: str) -> Tuple[str, Dict]:
+        """Run the per-file half of process_file (step 3) on a file."""
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return self._prepare_content(f.read())
+
+    def _clean_content(self, original_content: str) -> Tuple[str, Dict]:
+        """Remove malformed entries if the profile asks for it; start the counts."""
+        counts = {'original_indexes': len(re.findall(r'\\index\{[^}]*\}', original_content))}
+        if not self.profile.clean_malformed:
+            return original_content, counts
+
+        # First, clean up any existing malformed indexes
+        cleaned_content = self._remove_existing_malformed_indexes(original_content)
+        counts['cleaned_indexes'] = len(re.findall(r'\\index\{[^}]*\}', cleaned_content))
+        return cleaned_content, counts
+
+    def _timing_counts(self) -> Dict:
+        return {
+            'structural_checks': self.structural_timing['checks'],
+            'structural_check_ms': round(self.structural_timing['seconds'] * 1000, 3)
+        }
+
+    def _prepare_content(self, original_content: str) -> Tuple[str, Dict]:
+        """Step 3: insert index commands; returns the text and its counts."""
+        cleaned_content, counts = self._clean_content(original_content)
+        index_edits = self._collect_index_edits(cleaned_content)
+        counts.update(self._timing_counts())
+        return index_edits.apply(), counts
+
+    def _finish_content(self, content_with_indexes: str, counts: Dict,
+                        carry: Dict[str, int] = None) -> Tuple[str, Dict, Dict[str, int]]:
+        """Step 4: cleanup redundant commands, continuing from carry if given."""
+        final_content, carry_out = self._cleanup_redundant_indexes_carried(
+            content_with_indexes, carry or {})
+
+        # Count changes
+        inserted_indexes = len(re.findall(r'\\index\{[^}]*\}', content_with_indexes))
+        final_indexes = len(re.findall(r'\\index\{[^}]*\}', final_content))
+
+        return final_content, self._build_stats(counts, inserted_indexes, final_indexes), carry_out
+
+    def _process_content_streaming(self, original_content: str) -> Tuple[str, Dict]:
+        """Steps 3 and 4 in one pass; stats come from the emitted edit log."""
+        cleaned_content, counts = self._clean_content(original_content)
+        index_edits, stream_counts = self._stream_index_edits(cleaned_content)
+        counts.update(self._timing_counts())
+        emitted = len(index_edits.edits)
+
+        existing = stream_counts['existing']
+        stats = self._build_stats(counts,
+                                  inserted_indexes=existing + emitted + stream_counts['skipped'],
+                                  final_indexes=existing + emitted)
+        return index_edits.apply(), stats
+
+    def process_all_files(self, file_list: List[str], jobs: int = 1,
+                          manifest: IndexManifest = None, book_order: List[str] = None) -> Dict:
+        """Process all LaTeX files and return comprehensive stats.
+
+        With jobs > 1 files are processed in a process pool; stats are merged
+        in file_list order, exactly as in a serial run. Files the manifest
+        reports as unchanged are skipped and keep their previous stats. With
+        book_order (the \\include order from main.tex) min_word_distance is
+        enforced across chapters in that order, and stats follow it.
+        """
+        all_stats = {}
+        total_stats = {
+            'files_processed': 0,
+            'total_indexes_added': 0,
+        }
+        if self.profile.clean_malformed:
+            total_stats['total_malformed_removed'] = 0
+        total_stats['total_redundant_removed'] = 0
+
+        # Missing files are reported up front; the rest go through the pool in order
+        existing = []
+        for filepath in file_list:
+            if os.path.exists(filepath):
+                existing.append(filepath)
+            else:
+                print(f"File not found: {filepath}")
+                all_stats[filepath] = {'error': 'File not found'}
+
+        if book_order is not None:
+            outcomes = process_book(self, existing, book_order, jobs, manifest)
+        else:
+            outcomes = run_files(self, existing, jobs, manifest)
+
+        for filepath, stats, error, reused in outcomes:
+            if reused:
+                print(f"Unchanged since last run, skipping {filepath}")
+            else:
+                print(f"Processing {filepath}...")
+            if error is not None:
+                print(f"Error processing {filepath}: {error}")
+                all_stats[filepath] = {'error': error}
+                continue
+
+            diagnostics = stats.pop('diagnostics', None)
+            all_stats[filepath] = stats
+            total_stats['files_processed'] += 1
+            total_stats['total_indexes_added'] += stats['net_added']
+            total_stats['total_redundant_removed'] += stats['removed_redundant']
+
+            if self.profile.clean_malformed:
+                total_stats['total_malformed_removed'] += stats['removed_malformed']
+                print(f"  Net added: {stats['net_added']} index commands")
+                print(f"  Removed malformed: {stats['removed_malformed']}")
+                print(f"  Removed redundant: {stats['removed_redundant']}")
+            else:
+                print(f"  Added {stats['net_added']} index commands, "
+                      f"removed {stats['removed_redundant']} redundant")
+            if diagnostics:
+                print(f"  Structural checks: {diagnostics['structural_checks']} "
+                      f"in {diagnostics['structural_check_ms']} ms")
+
+        # Stats follow processing order: file_list, or book order with book_order
+        order = file_list if book_order is None else order_by_book(file_list, book_order)
+        all_stats = {f: all_stats[f] for f in order if f in all_stats}
+        all_stats['_totals'] = total_stats
+        return all_stats
+
+def parse_args(argv: List[str] = None, profile: str = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Insert \\index{} commands and remove redundant entries.")
+    if profile is None:
+        ap.add_argument("--profile", choices=sorted(PROFILES), default='basic',
+                        help="Index policy profile (default: basic).")
+    ap.add_argument("--streaming", action="store_true",
+                    help="Enforce the minimum word distance while inserting (single pass, "
+                         "keeps existing entries) instead of inserting then cleaning up.")
+    ap.add_argument("--nearby-chars", type=int, default=50,
+                    help="Skip a match if an \\index{} lies within this many characters (default: 50).")
+    ap.add_argument("--nearby-words", type=int, default=0,
+                    help="Measure the nearby-index window in words instead of characters.")
+    ap.add_argument("--jobs", type=int, default=1,
+                    help="Number of worker processes for chapter files (default: 1).")
+    ap.add_argument("--incremental", action="store_true",
+                    help="Skip chapters unchanged since the last run (per the profile's "
+                         "manifest) and reuse their stats.")
+    ap.add_argument("--book-wide", action="store_true",
+                    help="Enforce the minimum word distance across chapters in the "
+                         "\\include order of --main-tex.")
+    ap.add_argument("--main-tex", default="main.tex",
+                    help="Book file whose \\include list gives the chapter order (default: main.tex).")
+    ap.add_argument("--no-cache", action="store_true",
+                    help="Rebuild the term tables without reading or writing the cache.")
+    ap.add_argument("--clear-cache", action="store_true",
+                    help=f"Delete cached term tables in {DEFAULT_CACHE_DIR}/ before running.")
+    args = ap.parse_args(argv)
+    if profile is not None:
+        args.profile = profile
+    if args.book_wide and args.streaming:
+        ap.error("--book-wide is not supported with --streaming")
+    return args
+
+def main(argv: List[str] = None, profile: str = None):
+    """Main execution function."""
+    args = parse_args(argv, profile)
+    settings = PROFILES[args.profile]
+
+    # File paths
+    index_terms_file = "index_terms.json"
+
+    # List of LaTeX files to process
+    latex_files = [
+        "Chapters/Chapter01.tex", "Chapters/Chapter02.tex", "Chapters/Chapter03.tex",
+        "Chapters/Chapter04.tex", "Chapters/Chapter05.tex", "Chapters/Chapter06.tex",
+        "Chapters/Chapter07.tex", "Chapters/Chapter08.tex", "Chapters/Chapter09.tex",
+        "Chapters/Chapter10.tex", "Chapters/Chapter11.tex", "Chapters/Chapter12.tex",
+        "Chapters/Chapter13.tex", "Chapters/Chapter14.tex", "Chapters/Chapter15.tex",
+        "Chapters/Chapter16.tex", "Chapters/Chapter17.tex", "Chapters/Chapter18.tex",
+        "Chapters/Chapter19.tex", "Chapters/Chapter20.tex", "Chapters/Chapter21.tex",
+        "Chapters/Chapter22.tex", "Chapters/Chapter23.tex", "Chapters/Chapter24.tex",
+        "Chapters/Introduction.tex", "Chapters/Conclusion.tex",
+        "Chapters/Appendix00.tex", "Chapters/Appendix01.tex", "Chapters/Appendix02.tex",
+        "Chapters/Appendix03.tex", "Chapters/Appendix04.tex", "Chapters/Appendix05.tex",
+        "Chapters/Appendix06.tex"
+    ]
+
+    # Initialize processor
+    if not os.path.exists(index_terms_file):
+        print(f"Error: {index_terms_file} not found!")
+        return
+
+    if args.clear_cache:
+        print(f"Removed {clear_cache(DEFAULT_CACHE_DIR)} cached term table(s)")
+
+    processor = IndexEngine(index_terms_file, profile=args.profile, streaming=args.streaming,
+                            nearby_chars=args.nearby_chars, nearby_words=args.nearby_words,
+                            cache_dir=None if args.no_cache else DEFAULT_CACHE_DIR)
+
+    print(f"Starting {settings.title}")
+    print("=" * 60)
+    print(f"Loaded {len(processor.term_mappings)} term mappings"
+          f"{' (cached)' if processor.loaded_from_cache else ''}")
+    print(f"Minimum word distance: {processor.min_word_distance}")
+    if processor.streaming:
+        print("Streaming mode: distance enforced at insertion time")
+    print()
+
+    # Manifest of per-file hashes for --incremental, saved next to the results
+    options = {'book_wide': args.book_wide, 'streaming': args.streaming,
+               'nearby_chars': args.nearby_chars, 'nearby_words': args.nearby_words}
+    manifest = IndexManifest(settings.manifest_file, file_sha256(index_terms_file),
+                             f"{settings.name}-{PROCESSOR_VERSION}", options)
+    if args.incremental:
+        print(f"Incremental mode: {manifest.load()} file(s) in {settings.manifest_file}")
+
+    # Process all files
+    book_order = None
+    if args.book_wide:
+        book_order = read_include_order(args.main_tex)
+        print(f"Book-wide word distance over {len(book_order)} included chapters")
+    results = processor.process_all_files(latex_files, jobs=args.jobs, manifest=manifest,
+                                          book_order=book_order)
+    manifest.save()
+
+    # Print summary
+    print("\nProcessing Summary:")
+    print("=" * 60)
+    totals = results.get('_totals', {})
+    print(f"Files processed: {totals.get('files_processed', 0)}")
+    print(f"Total net index commands added: {totals.get('total_indexes_added', 0)}")
+    if settings.clean_malformed:
+        print(f"Total malformed commands removed: {totals.get('total_malformed_removed', 0)}")
+    print(f"Total redundant commands removed: {totals.get('total_redundant_removed', 0)}")
+
+    # Save detailed results
+    atomic_write(settings.results_file, json.dumps(results, indent=2))
+
+    print(f"\nDetailed results saved to {settings.results_file}")
+
+if __name__ == "__main__":
+    main()
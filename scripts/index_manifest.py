@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Content-hash manifest for incremental index runs.
+Remembers the sha256 of every chapter as the processor left it, together
+with the index_terms.json hash, processor version and options, so a later
+run can skip files nobody has touched and reuse their stats.
+"""
+
+import hashlib
+import json
+from typing import Dict, Optional
+
+from file_pool import atomic_write
+
+
+def file_sha256(path: str) -> str:
+    """Return the hex sha256 of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class IndexManifest:
+    """Per-file hashes and stats from the previous run.
+
+    Entries are only reused when the terms hash, processor version and
+    options recorded with them match the current run.
+    """
+
+    def __init__(self, path: str, terms_sha256: str, version: str, options: Dict):
+        self.path = path
+        self.header = {
+            'index_terms_sha256': terms_sha256,
+            'processor_version': version,
+            'options': options,
+        }
+        self.previous: Dict[str, Dict] = {}
+        self.files: Dict[str, Dict] = {}
+
+    def load(self) -> int:
+        """Read the previous manifest; return how many entries are reusable."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if all(data.get(key) == value for key, value in self.header.items()):
+            self.previous = data.get('files', {})
+        return len(self.previous)
+
+    def unchanged(self, filepath: str, **checkpoint) -> Optional[Dict]:
+        """Return the previous entry if filepath is as the last run left it.
+
+        Any checkpoint fields given (e.g. the incoming word-distance state)
+        must also match what was recorded with the entry.
+        """
+        entry = self.previous.get(filepath)
+        if entry is None or entry.get('sha256') != file_sha256(filepath):
+            return None
+        if any(entry.get(key) != value for key, value in checkpoint.items()):
+            return None
+        self.files[filepath] = entry
+        return entry
+
+    def record(self, filepath: str, stats: Dict, **checkpoint) -> None:
+        """Remember the file's current hash, its stats and any checkpoint fields.
+
+        Run diagnostics in stats (timings) describe this run only and are
+        not kept.
+        """
+        stats = {key: value for key, value in stats.items() if key != 'diagnostics'}
+        self.files[filepath] = dict({'sha256': file_sha256(filepath), 'stats': stats}, **checkpoint)
+
+    def save(self) -> None:
+        data = dict(self.header, files=self.files)
+        atomic_write(self.path, json.dumps(data, indent=2))
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Sorted \\index{} position table for the LaTeX indexing scripts.
+Tracks where existing and newly inserted index commands sit so the
+"index command nearby?" guard is a binary search instead of a regex over a
+fresh slice of the chapter.
+"""
+
+import math
+import re
+from typing import List, Optional, Tuple
+
+from edit_buffer import EditBuffer
+
+
+INDEX_PREFIX = '\\index{'
+
+# (original offset, back, length): the current position of the original
+# character at offset, less back, plus length
+Anchor = Tuple[int, int, int]
+
+
+class IndexPositions:
+    """Start/end offsets of every \\index{ occurrence, in text order.
+
+    Positions are stored against the original text and resolved through the
+    EditBuffer the commands are inserted into, so recording an insertion
+    never shifts the entries after it; queries take current coordinates.
+    An inserted command is anchored to the end of the insertions at its
+    offset: later insertions there go in front of it, so its anchor stays
+    valid. The end of an entry is just past the first closing brace after
+    it, as the regex \\index\\{[^}]*\\} would see it.
+    """
+
+    def __init__(self, text: str, edits: Optional[EditBuffer] = None):
+        self.edits = edits
+        self.starts: List[Anchor] = []
+        self.ends: List[Optional[Anchor]] = []  # None: no closing brace
+        for match in re.finditer(re.escape(INDEX_PREFIX), text):
+            close = text.find('}', match.end())
+            self.starts.append((match.start(), 0, 0))
+            self.ends.append((close, 0, 1) if close != -1 else None)
+
+    def _position(self, anchor: Optional[Anchor]) -> float:
+        if anchor is None:
+            return math.inf
+        offset, back, length = anchor
+        if self.edits is not None:
+            offset = self.edits.current_offset(offset)
+        return offset - back + length
+
+    def _bisect(self, anchors: List, position: int, hi: int = None, right: bool = False) -> int:
+        """bisect_left (or bisect_right) on the resolved positions of anchors[:hi]."""
+        lo, hi = 0, len(anchors) if hi is None else hi
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = self._position(anchors[mid])
+            if value < position or (right and value == position):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def add(self, offset: int, command: str) -> None:
+        """Record an index command just inserted into the edits at an original offset."""
+        position = self.edits.current_offset(offset, inclusive=False)
+        back = self.edits.current_offset(offset) - position
+        close = command.find('}')
+        new_end = (offset, back, close + 1) if close != -1 else None
+        idx = self._bisect(self.starts, position)
+
+        # Earlier entries still open at the insertion point now close inside it
+        for j in range(self._bisect(self.ends, position, idx, right=True), idx):
+            self.ends[j] = new_end
+
+        self.starts.insert(idx, (offset, back, 0))
+        self.ends.insert(idx, new_end)
+
+    def any_within(self, lo: int, hi: int) -> bool:
+        """Check for a complete index command inside [lo, hi)."""
+        idx = self._bisect(self.starts, lo)
+        return idx < len(self.starts) and self._position(self.ends[idx]) <= hi
+
+    def any_prefix_within(self, lo: int, hi: int) -> bool:
+        """Check for an \\index{ prefix inside [lo, hi)."""
+        idx = self._bisect(self.starts, lo)
+        return idx < len(self.starts) and self._position(self.starts[idx]) + len(INDEX_PREFIX) <= hi
+
+    def __len__(self) -> int:
+        return len(self.starts)
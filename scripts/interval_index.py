@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Interval index for the LaTeX indexing scripts.
+Holds sorted, non-overlapping regions (plain text, forbidden zones) and
+answers containment queries with a binary search.
+"""
+
+from bisect import bisect_right
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from edit_buffer import EditBuffer
+
+
+class IntervalIndex:
+    """Sorted, merged intervals with O(log n) containment lookups.
+
+    Intervals are stored in original-text coordinates. When an EditBuffer is
+    attached, query positions are taken in current coordinates and mapped
+    back through the buffer, so the index never goes stale as text is
+    inserted.
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[int, int]], closed: bool = False,
+                 edits: Optional[EditBuffer] = None):
+        self.closed = closed  # Whether the end offset belongs to the interval
+        self.edits = edits
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+
+        for start, end in sorted(intervals):
+            if self.ends and start <= self.ends[-1]:
+                # Overlapping or touching region, merge
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    def contains(self, position: int) -> bool:
+        """Check whether a position falls inside any interval."""
+        if self.edits is not None:
+            position = self.edits.original_offset(position)
+        idx = bisect_right(self.starts, position) - 1
+        if idx < 0:
+            return False
+        end = self.ends[idx]
+        return position <= end if self.closed else position < end
+
+    def __contains__(self, position: int) -> bool:
+        return self.contains(position)
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        return iter(zip(self.starts, self.ends))
+
+    def __len__(self) -> int:
+        return len(self.starts)
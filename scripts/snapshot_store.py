@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+snapshot_store.py
+
+Purpose:
+  Content-addressed snapshot store shared by the scripts that rewrite
+  sources in place (GlossaryInserter, gls_preflight.py, cleanup_gidx.py,
+  format_bib.py). Before a file is overwritten its bytes are stored once
+  as a blob named by their sha256, and the run's manifest records which
+  blob each path had. Unchanged content costs no new blob, and a whole
+  run can be rolled back with one command.
+
+  Layout (under .snapshots/ at the repository root by default):
+    blobs/<2 hex>/<sha256>   file contents
+    runs/<run-id>.json       tool, time, working directory and {path: sha256}
+
+Usage:
+  python scripts/snapshot_store.py list
+  python scripts/snapshot_store.py show <run-id>
+  python scripts/snapshot_store.py restore <run-id> [--dry-run]
+  python scripts/snapshot_store.py prune --keep 20
+
+Exit Codes:
+  0  Success
+  1  Unknown run id or a blob is missing
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+from file_pool import atomic_write
+
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".snapshots")
+
+
+class SnapshotStore:
+    """Blobs keyed by sha256 plus one manifest per run."""
+
+    def __init__(self, store_dir: Optional[str] = None):
+        self.store_dir = store_dir or DEFAULT_STORE_DIR
+        self.blob_dir = os.path.join(self.store_dir, "blobs")
+        self.run_dir = os.path.join(self.store_dir, "runs")
+
+    def blob_path(self, sha256: str) -> str:
+        return os.path.join(self.blob_dir, sha256[:2], sha256)
+
+    def put(self, data: bytes) -> str:
+        """Store data unless an identical blob exists; return its sha256."""
+        sha256 = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(sha256)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            atomic_write(path, data)
+        return sha256
+
+    def get(self, sha256: str) -> bytes:
+        with open(self.blob_path(sha256), 'rb') as f:
+            return f.read()
+
+    def runs(self) -> List[Dict]:
+        """Return every run manifest, oldest first."""
+        manifests = []
+        if os.path.isdir(self.run_dir):
+            for name in sorted(os.listdir(self.run_dir)):
+                if name.endswith('.json'):
+                    with open(os.path.join(self.run_dir, name), 'r', encoding='utf-8') as f:
+                        manifests.append(json.load(f))
+        return manifests
+
+    def load_run(self, run_id: str) -> Dict:
+        with open(os.path.join(self.run_dir, f"{run_id}.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def begin(self, tool: str) -> "SnapshotRun":
+        return SnapshotRun(self, tool)
+
+    def restore(self, run_id: str, dry_run: bool = False) -> Dict[str, List[str]]:
+        """Put every file of a run back to its snapshot.
+
+        Returns the paths grouped as restored, unchanged and missing (blob
+        not found). Files are replaced atomically, keeping their mode.
+        """
+        outcome = {'restored': [], 'unchanged': [], 'missing': []}
+        for path, sha256 in sorted(self.load_run(run_id)['files'].items()):
+            try:
+                data = self.get(sha256)
+            except OSError:
+                outcome['missing'].append(path)
+                continue
+            try:
+                with open(path, 'rb') as f:
+                    current = hashlib.sha256(f.read()).hexdigest()
+            except OSError:
+                current = None
+            if current == sha256:
+                outcome['unchanged'].append(path)
+                continue
+            if not dry_run:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                atomic_write(path, data)
+            outcome['restored'].append(path)
+        return outcome
+
+    def prune(self, keep: int) -> Dict[str, int]:
+        """Keep the newest runs and delete blobs no remaining run references."""
+        manifests = self.runs()
+        cutoff = max(0, len(manifests) - keep)
+        for manifest in manifests[:cutoff]:
+            os.unlink(os.path.join(self.run_dir, f"{manifest['run_id']}.json"))
+
+        referenced = set()
+        for manifest in manifests[cutoff:]:
+            referenced.update(manifest['files'].values())
+        removed_blobs = 0
+        if os.path.isdir(self.blob_dir):
+            for prefix in os.listdir(self.blob_dir):
+                for name in os.listdir(os.path.join(self.blob_dir, prefix)):
+                    if name not in referenced:
+                        os.unlink(os.path.join(self.blob_dir, prefix, name))
+                        removed_blobs += 1
+        return {'runs': cutoff, 'blobs': removed_blobs}
+
+
+class SnapshotRun:
+    """Snapshots taken by one invocation of a tool.
+
+    The manifest is rewritten after every snapshot, so a run that fails
+    halfway can still be restored.
+    """
+
+    def __init__(self, store: SnapshotStore, tool: str):
+        self.store = store
+        self.tool = tool
+        self.run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{tool}-{os.getpid()}"
+        self.files: Dict[str, str] = {}
+
+    def snapshot(self, path) -> str:
+        """Store the current bytes of path (once per run); return the sha256."""
+        path = os.path.abspath(path)
+        if path not in self.files:
+            with open(path, 'rb') as f:
+                self.files[path] = self.store.put(f.read())
+            self._save()
+        return self.files[path]
+
+    def __contains__(self, path) -> bool:
+        return os.path.abspath(path) in self.files
+
+    def restore_file(self, path) -> None:
+        """Put one snapshotted file back, e.g. after a failed write."""
+        path = os.path.abspath(path)
+        atomic_write(path, self.store.get(self.files[path]))
+
+    def _save(self) -> None:
+        os.makedirs(self.store.run_dir, exist_ok=True)
+        manifest = {
+            'run_id': self.run_id,
+            'tool': self.tool,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'cwd': os.getcwd(),
+            'files': self.files,
+        }
+        atomic_write(os.path.join(self.store.run_dir, f"{self.run_id}.json"), json.dumps(manifest, indent=2))
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="List, inspect and restore source snapshots.")
+    ap.add_argument("--store", default=DEFAULT_STORE_DIR,
+                    help="Snapshot store directory (default: .snapshots at the repository root).")
+    sub = ap.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="List recorded runs.")
+    show = sub.add_parser("show", help="List the files snapshotted by a run.")
+    show.add_argument("run_id")
+    restore = sub.add_parser("restore", help="Restore every file of a run.")
+    restore.add_argument("run_id")
+    restore.add_argument("--dry-run", action="store_true", help="Report what would be restored.")
+    prune = sub.add_parser("prune", help="Delete old runs and unreferenced blobs.")
+    prune.add_argument("--keep", type=int, default=20, help="Number of newest runs to keep (default: 20).")
+    return ap.parse_args(argv)
+
+
+def main(argv: List[str]) -> int:
+    args = parse_args(argv)
+    store = SnapshotStore(args.store)
+
+    if args.command == "list":
+        for manifest in store.runs():
+            print(f"{manifest['run_id']}  {manifest['created']}  {len(manifest['files'])} file(s)")
+        return 0
+
+    if args.command == "prune":
+        removed = store.prune(args.keep)
+        print(f"Removed {removed['runs']} run(s) and {removed['blobs']} blob(s)")
+        return 0
+
+    try:
+        manifest = store.load_run(args.run_id)
+    except OSError:
+        print(f"Unknown run id: {args.run_id}", file=sys.stderr)
+        return 1
+
+    if args.command == "show":
+        print(f"{manifest['run_id']} ({manifest['tool']}, {manifest['created']}, cwd {manifest['cwd']})")
+        for path, sha256 in sorted(manifest['files'].items()):
+            print(f"  {sha256[:12]}  {path}")
+        return 0
+
+    outcome = store.restore(args.run_id, dry_run=args.dry_run)
+    verb = "Would restore" if args.dry_run else "Restored"
+    for path in outcome['restored']:
+        print(f"{verb}: {path}")
+    for path in outcome['missing']:
+        print(f"Missing blob: {path}", file=sys.stderr)
+    print(f"{verb} {len(outcome['restored'])} file(s); {len(outcome['unchanged'])} already match")
+    return 1 if outcome['missing'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
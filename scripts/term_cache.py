@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+On-disk cache for compiled index term tables.
+Stores the flattened term mappings and matcher automaton as a pickle keyed
+by a hash of index_terms.json and the processor version, so a warm start
+skips JSON parsing and automaton construction. read_entry/write_entry
+cache any per-source result the same way (e.g. per-chapter extraction).
+"""
+
+import glob
+import hashlib
+import os
+import pickle
+import tempfile
+from typing import Any, Callable, Dict, Optional, Tuple
+
+DEFAULT_CACHE_DIR = ".index_cache"
+
+
+def cache_key(source: bytes, namespace: str, version: str) -> str:
+    """Hash the source bytes together with the processor name and version."""
+    digest = hashlib.sha256()
+    digest.update(f"{namespace}\0{version}\0".encode('utf-8'))
+    digest.update(source)
+    return digest.hexdigest()
+
+
+def entry_path(cache_dir: str, namespace: str, key: str) -> str:
+    return os.path.join(cache_dir, f"{namespace}-{key[:32]}.pickle")
+
+
+def read_entry(source: bytes, namespace: str, version: str, cache_dir: str) -> Optional[Any]:
+    """Return the cached value for source, or None if absent or unreadable."""
+    path = entry_path(cache_dir, namespace, cache_key(source, namespace, version))
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        return None
+
+
+def write_entry(source: bytes, namespace: str, version: str, cache_dir: str, value: Any) -> None:
+    """Cache value for source; failures only print a warning."""
+    path = entry_path(cache_dir, namespace, cache_key(source, namespace, version))
+    # Write to a temporary file first so readers never see a partial entry
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: could not write term cache {path}: {e}")
+
+
+def load_compiled(source_file: str, namespace: str, version: str,
+                  compile_fn: Callable[[bytes], Dict],
+                  cache_dir: Optional[str] = None) -> Tuple[Dict, bool]:
+    """Return (compiled tables, loaded_from_cache).
+
+    With cache_dir=None the cache is bypassed entirely. A missing or
+    unreadable cache entry is rebuilt with compile_fn and written back.
+    """
+    with open(source_file, 'rb') as f:
+        source = f.read()
+
+    if cache_dir is None:
+        return compile_fn(source), False
+
+    compiled = read_entry(source, namespace, version, cache_dir)
+    if compiled is not None:
+        return compiled, True
+
+    compiled = compile_fn(source)
+    write_entry(source, namespace, version, cache_dir, compiled)
+    return compiled, False
+
+
+def clear_cache(cache_dir: str = DEFAULT_CACHE_DIR) -> int:
+    """Delete cached entries; return how many were removed."""
+    removed = 0
+    for path in glob.glob(os.path.join(cache_dir, '*.pickle')):
+        os.remove(path)
+        removed += 1
+    return removed
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Multi-pattern term matcher for the LaTeX indexing scripts.
+Builds an Aho-Corasick automaton once from the index term variants and finds
+every case-insensitive, word-bounded occurrence in a single scan of the text.
+"""
+
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+def is_word_char(ch: str) -> bool:
+    """Return True for characters matched by the regex class \\w."""
+    return ch.isalnum() or ch == '_'
+
+
+def fold_case(text: str) -> str:
+    """Lowercase text while keeping every character offset unchanged."""
+    folded = text.lower()
+    if len(folded) == len(text):
+        return folded
+    # A few characters expand when lowercased; leave those untouched
+    return ''.join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+
+class TermMatcher:
+    """Aho-Corasick automaton over case-folded terms.
+
+    Pattern ids follow the order in which terms are first given, so callers
+    can pass terms in priority order and sort matches by id.
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        self.patterns: List[str] = []
+        self.pattern_ids: Dict[str, int] = {}
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+
+        for term in terms:
+            folded = fold_case(term)
+            if folded and folded not in self.pattern_ids:
+                self.pattern_ids[folded] = len(self.patterns)
+                self.patterns.append(folded)
+                self._add_pattern(folded)
+
+        self._build_failure_links()
+
+    def _add_pattern(self, pattern: str) -> None:
+        """Add one folded pattern to the trie."""
+        state = 0
+        for ch in pattern:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = next_state
+        self._out[state] = self._out[state] + (self.pattern_ids[pattern],)
+
+    def _build_failure_links(self) -> None:
+        """Compute failure links breadth-first and merge output sets."""
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for ch, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                link = self._goto[fallback].get(ch, 0)
+                self._fail[child] = link if link != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def pattern_id(self, term: str) -> int:
+        """Return the pattern id for a term (case-insensitive)."""
+        return self.pattern_ids[fold_case(term)]
+
+    def find_all(self, text: str) -> List[Tuple[int, int, int]]:
+        """Find every word-bounded occurrence as (start, end, pattern_id).
+
+        Occurrences may overlap; they are reported in order of their end
+        offset. Boundaries follow the semantics of the regex anchor \\b.
+        """
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        patterns = self.patterns
+        length = len(text)
+        matches = []
+        state = 0
+
+        for i, ch in enumerate(fold_case(text)):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not out[state]:
+                continue
+
+            end = i + 1
+            after_word = end < length and is_word_char(text[end])
+            for pid in out[state]:
+                start = end - len(patterns[pid])
+                first_word = is_word_char(text[start])
+                before_word = start > 0 and is_word_char(text[start - 1])
+                if before_word == first_word:
+                    continue
+                if after_word == is_word_char(text[i]):
+                    continue
+                matches.append((start, end, pid))
+
+        return matches
+
+    def find_by_pattern(self, text: str) -> Dict[int, List[Tuple[int, int]]]:
+        """Group occurrences per pattern, non-overlapping and left to right.
+
+        This is what a separate re.finditer(r'\\b' + term + r'\\b') per term
+        would return, computed in one pass over the text.
+        """
+        grouped: Dict[int, List[Tuple[int, int]]] = {}
+        for start, end, pid in self.find_all(text):
+            spans = grouped.setdefault(pid, [])
+            if spans and start < spans[-1][1]:
+                continue
+            spans.append((start, end))
+        return grouped
+
+    def find_longest(self, text: str) -> List[Tuple[int, int, int]]:
+        """Return leftmost-longest, non-overlapping occurrences."""
+        return list(self.iter_longest(text))
+
+    def iter_longest(self, text: str,
+                     accept: Optional[Callable[[int, int, int], bool]] = None) -> Iterator[Tuple[int, int, int]]:
+        """Yield leftmost-longest, non-overlapping occurrences.
+
+        An occurrence that accept(start, end, pattern_id) rejects gives way
+        to the next shorter one at the same start, then to later ones.
+        accept is called as the scan reaches each occurrence, so it sees
+        any state the caller updated for occurrences already yielded.
+        """
+        matches = sorted(self.find_all(text), key=lambda m: (m[0], m[0] - m[1]))
+        last_end = 0
+        for start, end, pid in matches:
+            if start >= last_end and (accept is None or accept(start, end, pid)):
+                last_end = end
+                yield start, end, pid
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Word offset table for the LaTeX indexing scripts.
+Records where every word starts and ends once per file so the number of
+words between two positions is a binary search plus a subtraction.
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from typing import List, Optional, Pattern, Sequence, Tuple
+
+
+class WordOffsets:
+    """Sorted word start/end offsets over a text.
+
+    strip_patterns are removed from the text first, in order, as repeated
+    re.sub calls would; words starting with skip_prefix are not counted.
+    All offsets refer to the unmodified text.
+    """
+
+    def __init__(self, text: str, strip_patterns: Sequence[Pattern] = (),
+                 skip_prefix: Optional[str] = None):
+        self.length = len(text)
+        cleaned = text
+        offsets = None  # Original offset of each cleaned character
+        for pattern in strip_patterns:
+            cleaned, offsets = self._strip(cleaned, offsets, pattern)
+
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        for match in re.finditer(r'\S+', cleaned):
+            if skip_prefix and match.group().startswith(skip_prefix):
+                continue
+            if offsets is None:
+                self.starts.append(match.start())
+                self.ends.append(match.end())
+            else:
+                self.starts.append(offsets[match.start()])
+                self.ends.append(offsets[match.end() - 1] + 1)
+
+    @staticmethod
+    def _strip(text: str, offsets: Optional[List[int]], pattern: Pattern):
+        """Remove pattern matches, keeping the original offset of each character."""
+        if offsets is None:
+            offsets = list(range(len(text)))
+        kept_text = []
+        kept_offsets = []
+        last = 0
+        for match in pattern.finditer(text):
+            kept_text.append(text[last:match.start()])
+            kept_offsets.extend(offsets[last:match.start()])
+            last = match.end()
+        kept_text.append(text[last:])
+        kept_offsets.extend(offsets[last:])
+        return ''.join(kept_text), kept_offsets
+
+    def count_between(self, pos1: int, pos2: int) -> int:
+        """Count words overlapping the text between two positions."""
+        start, end = min(pos1, pos2), max(pos1, pos2)
+        if start == end:
+            return 0
+        return max(0, bisect_left(self.starts, end) - bisect_right(self.ends, start))
+
+    def window_around(self, start: int, end: int, words: int) -> Tuple[int, int]:
+        """Return offsets reaching `words` words before start and after end."""
+        if words <= 0:
+            return start, end
+        before = bisect_right(self.ends, start)  # Words ending at or before start
+        after = bisect_left(self.starts, end)  # First word starting at or after end
+        lo = self.starts[before - words] if before >= words else 0
+        hi = self.ends[after + words - 1] if after + words <= len(self.ends) else self.length
+        return lo, hi
+
+    def __len__(self) -> int:
+        return len(self.starts)
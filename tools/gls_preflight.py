@@ -27,7 +27,8 @@ Auto-fix behavior (--fix-case):
   - For each \gls{Key} whose lowercase version (key.lower()) is defined and Key != key.lower(), replaces
     \gls{Key} with \gls{key.lower()} in source files.
   - Does NOT fix spaced keys (reported only).
-  - Creates a .bak backup before modifying a file (unless --no-backup).
+  - Snapshots each file into the shared snapshot store (.snapshots/) before modifying it
+    (unless --no-backup); undo a run with: python scripts/snapshot_store.py restore <run-id>
 
 Limitations:
   - Heuristic regex scanning; does not parse TeX fully.
@@ -44,7 +45,10 @@ import re
 import sys
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List, Set, Tuple
+from typing import Dict, List, Optional, Set, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+from snapshot_store import SnapshotRun, SnapshotStore
 
 
 GLOS_ENTRY_RE = re.compile(r'\\newglossaryentry\{([^}]+)\}')
@@ -107,7 +111,7 @@ def scan_file(path: Path,
               defined: Set[str],
               report: ScanReport,
               normalize_case: bool,
-              create_backup: bool) -> None:
+              snapshots: Optional[SnapshotRun]) -> None:
     try:
         original = path.read_text(encoding='utf-8', errors='replace')
     except Exception as e:
@@ -164,13 +168,11 @@ def scan_file(path: Path,
         modified = GLS_USE_RE.sub(repl_case, modified)
 
     if made_change:
-        if create_backup:
-            backup = path.with_suffix(path.suffix + '.bak')
-            if not backup.exists():
-                try:
-                    backup.write_text(original, encoding='utf-8')
-                except Exception as e:
-                    print(f"[WARN] Could not create backup for {path}: {e}", file=sys.stderr)
+        if snapshots is not None:
+            try:
+                snapshots.snapshot(path)
+            except Exception as e:
+                print(f"[WARN] Could not snapshot {path}: {e}", file=sys.stderr)
         try:
             path.write_text(modified, encoding='utf-8')
             report.files_modified += 1
@@ -231,7 +233,7 @@ def parse_args(argv: List[str]) -> argparse.Namespace:
     ap.add_argument("--fix-case", action="store_true",
                     help="Automatically convert \\gls{Key} to lowercase if lowercase variant is defined.")
     ap.add_argument("--no-backup", action="store_true",
-                    help="Do not create .bak backups for modified files.")
+                    help="Do not snapshot modified files into the snapshot store.")
     ap.add_argument("-v", "--verbose", action="store_true")
     return ap.parse_args(argv)
 
@@ -255,10 +257,15 @@ def main(argv: List[str]) -> int:
         print(f"[INFO] Scanning {len(tex_files)} file(s).")
 
     report = ScanReport()
+    snapshots = None if args.no_backup else SnapshotStore().begin("gls_preflight")
     for f in tex_files:
-        scan_file(f, defined, report, normalize_case=args.fix_case, create_backup=not args.no_backup)
+        scan_file(f, defined, report, normalize_case=args.fix_case, snapshots=snapshots)
 
-    return summarize(report, args.verbose)
+    status = summarize(report, args.verbose)
+    if snapshots is not None and snapshots.files:
+        print(f"Originals saved as snapshot run {snapshots.run_id} "
+              f"(restore: python scripts/snapshot_store.py restore {snapshots.run_id})")
+    return status
 
 
 if __name__ == "__main__":